@@ -0,0 +1,37 @@
+"""Fixtures and statistics shared by the benchmarks and the example's load generator.
+
+Import after putting framework/ on sys.path, as the benchmark scripts do.
+"""
+import json
+import statistics
+
+from workflow_types import LLMState
+
+
+def conversation(messages: int) -> LLMState:
+    """An LLMState of alternating agent messages and send_agents_message turns."""
+    history = []
+    for index in range(messages // 2):
+        history.append({"role": "user", "content": json.dumps({"from": "agent", "agent_id": "HDFCBank", "message": "Quote for iPhone 15: 79,900 with 6 month no-cost EMI. " * 4})})
+        history.append({"role": "assistant", "content": [
+            {"type": "text", "text": "<thinking I will call response tool.</thinking>"},
+            {"type": "tool_use", "id": f"toolu_{index}", "name": "send_agents_message", "input": {"thinking": "Forward the quote to the consumer. " * 3, "agent_messages": [{"to_id": "Anil", "agent_type": "consumer", "message": "Best offer so far " * 10}]}},
+        ]})
+    return LLMState(user_id="Anil", persona_type="consumer", run_id="run1", system_message="You are a shopping assistant. " * 40, messages=history)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else 0.0,
+    }
@@ -0,0 +1,138 @@
+"""Per-turn CPU cost of the framework's logging: the old eager prints vs agent_logging.
+
+Replays the log calls one agent turn used to make (full model response as indented JSON, the whole
+LLMState on a state query, every incoming message and tool call) against the equivalent
+agent_logging calls, at a few conversation sizes. Output goes to os.devnull in both cases, so
+only formatting and serialization are measured.
+
+    python benchmarks/logging_benchmark.py --turns 2000 --output benchmarks/results/logging.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "framework"))
+
+from agent_logging import configure_logging, get_logger  # noqa: E402
+from benchmark_support import conversation  # noqa: E402
+from workflow_types import LLMState  # noqa: E402
+
+
+def model_response(turn: int) -> dict:
+    return {
+        "id": f"msg_{turn}",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-3-5-sonnet-20241022",
+        "content": [{"type": "tool_use", "id": f"toolu_{turn}", "name": "send_agents_message", "input": {"thinking": "Ask both banks. " * 20, "agent_messages": [{"to_id": bank, "agent_type": "issuer", "message": "Purchase intent: iPhone 15, budget 80k, prefers EMI. " * 5} for bank in ("HDFCBank", "ICICIBank")]}}],
+        "stop_reason": "tool_use",
+        "usage": {"input_tokens": 5120, "output_tokens": 310, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 4800},
+    }
+
+
+def print_turn(state: LLMState, response: dict) -> None:
+    """What one turn printed before agent_logging."""
+    message = {"from": "HDFCBank", "message": "Quote for iPhone 15"}
+    print("Input is a dictionary: (received message)")
+    print("received Agent message: ", message)
+    usage = response["usage"]
+    print(f"Turn usage: input={usage['input_tokens']} output={usage['output_tokens']} cache_read={usage['cache_read_input_tokens']} cache_write={usage['cache_creation_input_tokens']}")
+    print(f"LLM timing: {({'streamed': False, 'duration_ms': 812.5})}")
+    print(f"Initial response: {json.dumps(response, indent=2)}")
+    print(f"Turn 1 tokens: cache_read={usage['cache_read_input_tokens']} cache_write=0 uncached_input={usage['input_tokens']}")
+    print(f"Total tools to call: {len(response['content'])}")
+    for block in response["content"]:
+        print("all additional tools: ", state.tools)
+        print("Thinking:", block["input"]["thinking"])
+        for agent_message in block["input"]["agent_messages"]:
+            print("Agent Message:", agent_message)
+    print("Querying state", state)
+
+
+signal_log = get_logger("workflow.signal")
+llm_log = get_logger("llm")
+response_log = get_logger("llm.response")
+turn_log = get_logger("workflow.turn")
+tool_log = get_logger("workflow.tools")
+query_log = get_logger("workflow.query")
+
+
+def log_turn(state: LLMState, response: dict) -> None:
+    """The same turn through agent_logging, as the framework now logs it."""
+    message = {"from": "HDFCBank", "message": "Quote for iPhone 15"}
+    signal_log.debug("Received agent message: {message}", message=message)
+    usage = response["usage"]
+    llm_log.info(
+        "Turn usage: input={input_tokens} output={output_tokens} cache_read={cache_read} cache_write={cache_write}",
+        input_tokens=usage["input_tokens"],
+        output_tokens=usage["output_tokens"],
+        cache_read=usage["cache_read_input_tokens"],
+        cache_write=usage["cache_creation_input_tokens"],
+        timing={"streamed": False, "duration_ms": 812.5},
+        user_id=state.user_id,
+        run_id=state.run_id,
+    )
+    response_log.debug("Response {id}", id=response["id"], response=lambda: json.dumps(response))
+    turn_log.info(
+        "Turn {turn} tokens: cache_read={cache_read} cache_write={cache_write} uncached_input={uncached_input}",
+        turn=1,
+        cache_read=usage["cache_read_input_tokens"],
+        cache_write=0,
+        uncached_input=usage["input_tokens"],
+        user_id=state.user_id,
+    )
+    tool_log.debug("Tools to call: {count}", count=len(response["content"]))
+    for block in response["content"]:
+        tool_log.debug("Thinking: {thinking}", thinking=block["input"]["thinking"])
+        for agent_message in block["input"]["agent_messages"]:
+            tool_log.debug("Agent message: {message}", message=agent_message)
+    query_log.debug("Querying state", messages=len(state.messages))
+
+
+def cpu_per_turn(turn_fn, state: LLMState, turns: int) -> float:
+    responses = [model_response(turn) for turn in range(turns)]
+    started = time.process_time()
+    for response in responses:
+        turn_fn(state, response)
+    return (time.process_time() - started) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging CPU per agent turn")
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--sizes", default="10,50,200", help="conversation sizes in messages")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        scenarios = [
+            ("agent_logging info", {"level": "INFO"}),
+            ("agent_logging debug, responses sampled 1%", {"level": "DEBUG", "sampling": {"llm.response": 0.01}}),
+        ]
+        for size in (int(size) for size in args.sizes.split(",")):
+            state = conversation(size)
+            with contextlib.redirect_stdout(devnull):
+                baseline = cpu_per_turn(print_turn, state, args.turns)
+            row = {"messages": size, "print_us_per_turn": baseline}
+            for name, options in scenarios:
+                configure_logging(stream=devnull, **options)
+                row[f"{name} us_per_turn"] = cpu_per_turn(log_turn, state, args.turns)
+            row["cpu_saved_us_per_turn"] = baseline - row["agent_logging info us_per_turn"]
+            results.append(row)
+
+    configure_logging()
+    for row in results:
+        print(json.dumps(row))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"turns": args.turns, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
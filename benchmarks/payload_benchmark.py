@@ -0,0 +1,94 @@
+"""Bytes and CPU per agent turn for the framework's payload encodings.
+
+Encodes and decodes what one turn sends through Temporal (the LLMState passed to llm_call, the
+raw response dict it returns, an AgentMessageParams and a ScheduleParams) with the SDK's default
+converter and with the payload_codec settings, at a few conversation sizes.
+
+    python benchmarks/payload_benchmark.py --turns 200 --output benchmarks/results/payloads.json
+
+Install orjson (and zstandard for the zstd rows) to measure the fast paths; without them the
+fast JSON rows fall back to the stdlib json module.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "framework"))
+
+from benchmark_support import conversation  # noqa: E402
+from payload_codec import NONE, ZLIB, ZSTD, PayloadSettings, orjson, zstandard  # noqa: E402
+from workflow_types import AgentMessageParams, LLMState, ScheduleParams  # noqa: E402
+
+
+def turn_values(state: LLMState) -> list[tuple[object, type]]:
+    """(value, type hint) for every payload one turn encodes."""
+    response = {
+        "role": "assistant",
+        "content": [{"type": "tool_use", "id": "toolu_x", "name": "send_agents_message", "input": {"thinking": "Ask both banks. " * 20, "agent_messages": [{"to_id": "HDFCBank", "agent_type": "issuer", "message": "Purchase intent: iPhone 15, budget 80k. " * 5}]}}],
+        "usage": {"input_tokens": 5120, "output_tokens": 310, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 4800},
+        "timing": {"streamed": False, "duration_ms": 812.5},
+    }
+    message = AgentMessageParams(to_id="HDFCBank", agent_type="issuer", message="Purchase intent: iPhone 15, budget 80k. " * 5, user_id="Anil", run_id="run1")
+    reminder = ScheduleParams(time=3600, message="Follow up with the banks", user_id="Anil", run_id="run1", persona_type="consumer")
+    return [(state, LLMState), (response, dict), (message, AgentMessageParams), (reminder, ScheduleParams)]
+
+
+async def measure(settings: PayloadSettings, values: list[tuple[object, type]], turns: int) -> dict:
+    converter = settings.data_converter()
+    payload_bytes = 0
+    started = time.process_time()
+    for _ in range(turns):
+        for value, hint in values:
+            payloads = await converter.encode([value])
+            payload_bytes += sum(payload.ByteSize() for payload in payloads)
+            await converter.decode(payloads, [hint])
+    cpu = time.process_time() - started
+    return {"bytes_per_turn": payload_bytes / turns, "cpu_us_per_turn": cpu / turns * 1e6}
+
+
+async def run(args) -> list[dict]:
+    scenarios = [
+        ("default", PayloadSettings()),
+        ("fast_json", PayloadSettings(fast_json=True)),
+        ("fast_json+zlib", PayloadSettings(fast_json=True, compression=ZLIB, compress_min_bytes=args.min_bytes)),
+    ]
+    if zstandard is not None:
+        scenarios.append(("fast_json+zstd", PayloadSettings(fast_json=True, compression=ZSTD, compress_min_bytes=args.min_bytes)))
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        values = turn_values(conversation(size))
+        row = {"messages": size}
+        for name, settings in scenarios:
+            row[name] = await measure(settings, values, args.turns)
+        baseline = row["default"]
+        for name, _ in scenarios[1:]:
+            row[name]["bytes_saved_pct"] = (1 - row[name]["bytes_per_turn"] / baseline["bytes_per_turn"]) * 100
+            row[name]["cpu_change_pct"] = (row[name]["cpu_us_per_turn"] / baseline["cpu_us_per_turn"] - 1) * 100
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload bytes and CPU per agent turn")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--sizes", default="10,50,200", help="conversation sizes in messages")
+    parser.add_argument("--min-bytes", type=int, default=PayloadSettings().compress_min_bytes, help="compression threshold")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json)'}, zstandard: {'yes' if zstandard is not None else 'no'}, compression: {NONE} by default")
+    for row in results:
+        print(json.dumps(row))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"turns": args.turns, "orjson": orjson is not None, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Offline throughput/latency benchmark for BaseAgentWorkflow.
+
+Runs the real workflow under temporalio.testing.WorkflowEnvironment with a stub llm_call that
+sleeps for a configurable latency and answers with scripted tool_use blocks, so the numbers
+measure the framework's own overhead: workflow tasks, history growth, payload sizes, worker memory.
+
+    python benchmarks/workflow_benchmark.py --workflows 4 --turns 50 --llm-latency-ms 20
+    python benchmarks/workflow_benchmark.py --compare benchmarks/results/<earlier run>.json
+
+Each run writes a JSON result (tagged with the git commit) to benchmarks/results/ or --output.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "framework"))
+
+from temporalio import activity  # noqa: E402
+from temporalio.api.enums.v1 import EventType  # noqa: E402
+from temporalio.testing import WorkflowEnvironment  # noqa: E402
+from temporalio.worker import Worker  # noqa: E402
+
+from activities import (  # noqa: E402
+    ContinueAsNewPolicy,
+    InvocationParams,
+    LLMState,
+    SummarizeParams,
+    calculator,
+    load_agent_config,
+    rehydrate_llm_state,
+)
+from agent_config import agent_config_registry  # noqa: E402
+from BaseAgentWorkflow import BaseAgentWorkflow  # noqa: E402
+from benchmark_support import summarize  # noqa: E402
+from tool_registry import builtin_tool_registry  # noqa: E402
+
+TASK_QUEUE = "benchmark-queue"
+
+# Scripted model turns, cycled through: one tool activity, one in-workflow tool, two parallel tools.
+SCRIPT = [
+    [{"name": "calculator", "input": {"thinking": "add", "expression": "(2 + 3) * 4"}}],
+    [{"name": "send_operator_message", "input": {"thinking": "report", "operator_message": "Quote ready."}}],
+    [
+        {"name": "calculator", "input": {"thinking": "a", "expression": "17 * 3"}},
+        {"name": "calculator", "input": {"thinking": "b", "expression": "120 / 8"}},
+    ],
+]
+
+stub_settings = {"latency_ms": 0.0, "output_tokens": 120}
+stub_stats = {"llm_calls": 0, "request_bytes": 0}
+
+
+@activity.defn(name="llm_call")
+async def stub_llm_call(params: LLMState) -> dict:
+    stub_stats["llm_calls"] += 1
+    stub_stats["request_bytes"] += len(json.dumps(asdict(params)))
+    params = rehydrate_llm_state(params)
+    await asyncio.sleep(stub_settings["latency_ms"] / 1000)
+    turn = sum(1 for message in params.messages if message.get("role") == "assistant")
+    content = [
+        {"type": "tool_use", "id": f"toolu_{turn}_{index}", **tool}
+        for index, tool in enumerate(SCRIPT[turn % len(SCRIPT)])
+    ]
+    input_tokens = sum(len(json.dumps(message)) // 4 for message in params.messages)
+    return {
+        "role": "assistant",
+        "content": content,
+        "usage": {"input_tokens": input_tokens, "output_tokens": stub_settings["output_tokens"]},
+        "timing": {"stub": True, "duration_ms": stub_settings["latency_ms"]},
+    }
+
+
+@activity.defn(name="summarize_conversation")
+async def stub_summarize_conversation(params: SummarizeParams) -> str:
+    return f"{params.previous_summary} Summary of {len(params.messages)} messages.".strip()
+
+
+def write_agent_config(config_dir: str, user_id: str, args) -> None:
+    config = {
+        "system_msg": "You are a benchmark agent.",
+        "agents": {},
+        "language": "English",
+        "user_id": user_id,
+        "tools": builtin_tool_registry.schemas(),
+        "additional_tools": [],
+        "continue_as_new": asdict(ContinueAsNewPolicy(enabled=args.continue_as_new, max_turns=args.max_turns_per_run)),
+        "message_store": args.message_store,
+        "prompt_caching": True,
+        "response_cache": False,
+    }
+    with open(os.path.join(config_dir, f"benchmark_{user_id}.json"), "w") as f:
+        json.dump(config, f)
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+async def drive_agent(client, user_id: str, turns: int) -> dict:
+    """Send one message per turn and wait for the turn to finish (closed loop)."""
+    workflow_id = f"benchmark_{user_id}_{uuid.uuid4().hex[:8]}"
+    handle = await client.start_workflow(
+        BaseAgentWorkflow._run_,
+        InvocationParams(user_id=user_id, run_id="bench", agent_type="benchmark"),
+        id=workflow_id,
+        task_queue=TASK_QUEUE,
+    )
+    turn_latencies = []
+    messages = 0
+    for turn in range(turns):
+        started = time.perf_counter()
+        await handle.signal(BaseAgentWorkflow.agent_msg_signal, {"from": "operator", "message": f"Request {turn}"})
+        while True:
+            counts = await handle.query(BaseAgentWorkflow.get_token_count)
+            # Each turn adds the incoming message, the assistant tool_use and the tool results, so the
+            # count is a multiple of three between turns; it also drops when the run continues-as-new.
+            if counts["messages"] != messages and counts["messages"] % 3 == 0:
+                messages = counts["messages"]
+                break
+            await asyncio.sleep(0.001)
+        turn_latencies.append((time.perf_counter() - started) * 1000)
+    history = await handle.fetch_history()
+    await handle.terminate("benchmark finished")
+    return {"workflow_id": workflow_id, "turn_latencies_ms": turn_latencies, "history": history}
+
+
+def history_metrics(history) -> dict:
+    events = list(history.events)
+    task_latencies = []
+    scheduled_at = None
+    for event in events:
+        if event.event_type == EventType.EVENT_TYPE_WORKFLOW_TASK_SCHEDULED:
+            scheduled_at = event.event_time.ToDatetime()
+        elif event.event_type == EventType.EVENT_TYPE_WORKFLOW_TASK_COMPLETED and scheduled_at is not None:
+            task_latencies.append((event.event_time.ToDatetime() - scheduled_at).total_seconds() * 1000)
+            scheduled_at = None
+    return {
+        "events": len(events),
+        "bytes": sum(event.ByteSize() for event in events),
+        "workflow_task_latencies_ms": task_latencies,
+    }
+
+
+async def run_benchmark(args) -> dict:
+    stub_settings["latency_ms"] = args.llm_latency_ms
+    config_dir = tempfile.mkdtemp(prefix="agent-bench-")
+    user_ids = [f"agent{index}" for index in range(args.workflows)]
+    for user_id in user_ids:
+        write_agent_config(config_dir, user_id, args)
+    agent_config_registry.config_dir = config_dir
+    agent_config_registry.invalidate()
+    agent_config_registry.load_all()
+
+    if args.env == "local":
+        env = await WorkflowEnvironment.start_local()
+    else:
+        env = await WorkflowEnvironment.start_time_skipping()
+    rss_before = current_rss_bytes()
+    async with env:
+        async with Worker(
+            env.client,
+            task_queue=TASK_QUEUE,
+            workflows=[BaseAgentWorkflow],
+            activities=[stub_llm_call, stub_summarize_conversation, load_agent_config, calculator],
+        ):
+            started = time.perf_counter()
+            runs = await asyncio.gather(*(drive_agent(env.client, user_id, args.turns) for user_id in user_ids))
+            elapsed = time.perf_counter() - started
+
+    total_turns = args.workflows * args.turns
+    histories = [history_metrics(run["history"]) for run in runs]
+    turn_latencies = [latency for run in runs for latency in run["turn_latencies_ms"]]
+    task_latencies = [latency for history in histories for latency in history["workflow_task_latencies_ms"]]
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": vars(args),
+        "results": {
+            "total_turns": total_turns,
+            "elapsed_seconds": elapsed,
+            "turns_per_second": total_turns / elapsed if elapsed else 0.0,
+            "turn_latency_ms": summarize(turn_latencies),
+            "workflow_task_latency_ms": summarize(task_latencies),
+            # Only the last run of each workflow when continue-as-new is on.
+            "history_events_per_turn": sum(h["events"] for h in histories) / total_turns,
+            "history_bytes_per_turn": sum(h["bytes"] for h in histories) / total_turns,
+            "llm_calls": stub_stats["llm_calls"],
+            "llm_request_bytes_per_call": stub_stats["request_bytes"] / max(1, stub_stats["llm_calls"]),
+            "worker_rss_bytes": current_rss_bytes(),
+            "worker_rss_growth_bytes": current_rss_bytes() - rss_before,
+            "worker_max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """Print the change of every numeric result against an earlier run."""
+    print(f"{'metric':45} {baseline['commit']:>12} {current['commit']:>12} {'change':>9}")
+    for key, value in current["results"].items():
+        old = baseline["results"].get(key)
+        pairs = [(key, value, old)]
+        if isinstance(value, dict):
+            pairs = [(f"{key}.{sub}", value[sub], (old or {}).get(sub)) for sub in value]
+        for name, new, before in pairs:
+            if not isinstance(new, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            change = f"{(new - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name:45} {before:12.2f} {new:12.2f} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workflows", type=int, default=4, help="concurrent agent workflows")
+    parser.add_argument("--turns", type=int, default=30, help="turns per workflow")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="stub llm_call latency")
+    parser.add_argument("--env", choices=["time-skipping", "local"], default="time-skipping")
+    parser.add_argument("--message-store", action="store_true", help="send conversation refs instead of bodies")
+    parser.add_argument("--continue-as-new", action="store_true")
+    parser.add_argument("--max-turns-per-run", type=int, default=200)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/workflow-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args))
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"workflow-{result['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result["results"], indent=2))
+    print(f"Results written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
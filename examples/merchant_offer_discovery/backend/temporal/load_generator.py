@@ -0,0 +1,359 @@
+"""Load generator for the merchant offer discovery marketplace.
+
+Runs N consumers x M issuers x K merchants in one process on a local Temporal server, with a stub
+LLM that follows the example's protocol instead of calling the model:
+
+    operator --intent--> consumer --intent--> every issuer --query--> every merchant
+    merchant --quote--> issuer (after all K quotes) --offer--> consumer (after all M offers)
+    consumer --ranked offers--> operator
+
+and reports end-to-end offer discovery latency (p50/p95/p99), messages and LLM calls per run, and
+how saturated the worker's activity slots and event loop were.
+
+    python load_generator.py --consumers 20 --issuers 3 --merchants 4 --runs 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+FRAMEWORK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../framework"))
+BENCHMARKS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../benchmarks"))
+sys.path.insert(0, FRAMEWORK_DIR)
+sys.path.insert(1, BENCHMARKS_DIR)
+
+from temporalio import activity  # noqa: E402
+from temporalio.client import Client  # noqa: E402
+from temporalio.service import RPCError  # noqa: E402
+from temporalio.testing import WorkflowEnvironment  # noqa: E402
+from temporalio.worker import ActivityInboundInterceptor, Interceptor, Worker  # noqa: E402
+
+from activities import (  # noqa: E402
+    InvocationParams,
+    LLMState,
+    calculator,
+    load_agent_config,
+    multicast_agent_message,
+    rehydrate_llm_state,
+    send_message_to_agent_tool,
+)
+from agent_config import agent_config_registry  # noqa: E402
+from BaseAgentWorkflow import BaseAgentWorkflow  # noqa: E402
+from benchmark_support import percentile, summarize  # noqa: E402
+from payload_codec import get_payload_settings  # noqa: E402
+from task_routing import SHARED, TaskQueueRouting, set_task_queue_routing  # noqa: E402
+from temporal_client import set_temporal_client  # noqa: E402
+from tool_registry import builtin_tool_registry  # noqa: E402
+from worker_tuning import WorkerTuning  # noqa: E402
+
+TASK_QUEUE = "marketplace-queue"
+PRODUCTS = ["iPhone 15", "Galaxy S24", "PlayStation 5", "MacBook Air", "Dyson V15"]
+
+
+class Marketplace:
+    def __init__(self, consumers: int, issuers: int, merchants: int, llm_latency_ms: float):
+        self.consumers = [f"consumer{index}" for index in range(consumers)]
+        self.issuers = [f"issuer{index}" for index in range(issuers)]
+        self.merchants = [f"merchant{index}" for index in range(merchants)]
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_calls = defaultdict(int)
+        self.messages = defaultdict(int)
+        self.finished: dict[str, asyncio.Future] = {}
+
+    def agents_for(self, agent_type: str) -> dict:
+        def directory(ids, type_name, about):
+            return {agent_id: {"type": type_name, "about": about} for agent_id in ids}
+        if agent_type == "consumer":
+            return directory(self.issuers, "Issuer", "Bank that collects quotes and builds payment plans.")
+        if agent_type == "issuer":
+            return {
+                **directory(self.merchants, "Merchant", "Store that quotes products and discounts."),
+                **directory(self.consumers, "Consumer", "Shopping assistant of a card holder."),
+            }
+        return directory(self.issuers, "Issuer", "Bank that collects quotes and builds payment plans.")
+
+    def write_configs(self, config_dir: str) -> None:
+        for agent_type, ids in (("consumer", self.consumers), ("issuer", self.issuers), ("merchant", self.merchants)):
+            for agent_id in ids:
+                config = {
+                    "system_msg": f"You are the {agent_type} agent {agent_id}.",
+                    "agents": self.agents_for(agent_type),
+                    "language": "English",
+                    "user_id": agent_id,
+                    "tools": builtin_tool_registry.schemas(),
+                    "additional_tools": [],
+                    "response_cache": False,
+                }
+                with open(os.path.join(config_dir, f"{agent_type}_{agent_id}.json"), "w") as f:
+                    json.dump(config, f)
+
+    def respond(self, state: LLMState) -> list[dict]:
+        """Scripted tool_use blocks for the agent's next turn."""
+        received = inbox(state.messages)
+        latest = received[-1] if received else {"agent_id": "operator", "message": ""}
+        kind, fields = parse(latest["message"])
+        if state.persona_type == "consumer":
+            if latest["agent_id"] == "operator":
+                return [self.send(state, [(issuer, "issuer", f"INTENT product={fields.get('product', PRODUCTS[0])}") for issuer in self.issuers])]
+            offers = [parse(message["message"])[1] for message in received if message["message"].startswith("OFFER")]
+            if len(offers) < len(self.issuers):
+                return []
+            ranked = sorted(offers, key=lambda offer: float(offer["price"]))
+            future = self.finished.get(state.run_id)
+            if future is not None and not future.done():
+                future.set_result(time.perf_counter())
+            return [tool_use("send_operator_message", {
+                "thinking": "All issuers answered; ranking offers.",
+                "operator_message": "Best offers: " + ", ".join(f"{o['issuer']} at {o['price']}" for o in ranked),
+            })]
+        if state.persona_type == "issuer":
+            if kind == "INTENT":
+                return [self.send(state, [(merchant, "merchant", f"QUERY product={fields['product']}") for merchant in self.merchants])]
+            if kind == "QUOTE":
+                quotes = [parse(message["message"])[1] for message in received if message["message"].startswith("QUOTE")]
+                if len(quotes) < len(self.merchants):
+                    return []
+                consumer = next(message["agent_id"] for message in received if message["message"].startswith("INTENT"))
+                best = min(float(quote["price"]) for quote in quotes)
+                return [self.send(state, [(consumer, "consumer", f"OFFER issuer={state.user_id} price={best * 0.95:.2f}")])]
+            return []
+        if kind == "QUERY":
+            price = 500 + (sum(map(ord, state.user_id + fields["product"])) % 500)
+            return [self.send(state, [(latest["agent_id"], "issuer", f"QUOTE merchant={state.user_id} price={price}")])]
+        return []
+
+    def send(self, state: LLMState, messages: list[tuple[str, str, str]]) -> dict:
+        self.messages[state.run_id] += len(messages)
+        return tool_use("send_agents_message", {
+            "thinking": "Forwarding to the next party.",
+            "agent_messages": [
+                {"to_id": to_id, "agent_type": agent_type, "message": message}
+                for to_id, agent_type, message in messages
+            ],
+        })
+
+
+def tool_use(name: str, tool_input: dict) -> dict:
+    return {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}", "name": name, "input": tool_input}
+
+
+def inbox(messages: list[dict]) -> list[dict]:
+    """Incoming agent/operator messages, oldest first; see BaseAgentWorkflow._format_input_message."""
+    received = []
+    for message in messages:
+        if message.get("role") != "user" or not isinstance(message.get("content"), str):
+            continue
+        payload = json.loads(message["content"])
+        for item in payload if isinstance(payload, list) else [payload]:
+            received.append({"agent_id": item.get("agent_id", "operator"), "message": str(item.get("message", ""))})
+    return received
+
+
+def parse(message: str) -> tuple[str, dict]:
+    kind, _, rest = message.partition(" ")
+    fields = {}
+    key = None
+    for token in rest.split(" "):
+        if "=" in token:
+            key, _, value = token.partition("=")
+            fields[key] = value
+        elif key is not None:
+            fields[key] += " " + token
+    return kind, fields
+
+
+marketplace: Marketplace | None = None
+
+
+@activity.defn(name="llm_call")
+async def stub_llm_call(params: LLMState) -> dict:
+    params = rehydrate_llm_state(params)
+    marketplace.llm_calls[params.run_id] += 1
+    await asyncio.sleep(random.uniform(0.5, 1.5) * marketplace.llm_latency_ms / 1000)
+    content = marketplace.respond(params) or [{"type": "text", "text": "Waiting for the remaining replies."}]
+    return {
+        "role": "assistant",
+        "content": content,
+        "usage": {"input_tokens": 0, "output_tokens": 0},
+        "timing": {"stub": True},
+    }
+
+
+class SaturationMonitor(Interceptor):
+    """Tracks activities in flight against the worker's activity slots, and event loop lag."""
+
+    def __init__(self, activity_slots: int):
+        self.activity_slots = activity_slots
+        self.in_flight = 0
+        self.peak = 0
+        self.samples = []
+        self.loop_lag_ms = []
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        monitor = self
+
+        class _Inbound(ActivityInboundInterceptor):
+            async def execute_activity(self, input):
+                monitor.in_flight += 1
+                monitor.peak = max(monitor.peak, monitor.in_flight)
+                try:
+                    return await super().execute_activity(input)
+                finally:
+                    monitor.in_flight -= 1
+
+        return _Inbound(next)
+
+    async def sample(self, interval: float = 0.05):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag_ms.append((time.perf_counter() - started - interval) * 1000)
+            self.samples.append(self.in_flight)
+
+    def report(self) -> dict:
+        return {
+            "activity_slots": self.activity_slots,
+            "peak_activities_in_flight": self.peak,
+            "mean_activity_slot_utilization": statistics.fmean(self.samples) / self.activity_slots if self.samples else 0.0,
+            "event_loop_lag_ms_p95": percentile(self.loop_lag_ms, 0.95),
+            "event_loop_lag_ms_max": max(self.loop_lag_ms, default=0.0),
+        }
+
+
+async def offer_discovery(client: Client, consumer: str, run_id: str) -> float:
+    """Start one purchase intent and return its end-to-end latency in milliseconds."""
+    marketplace.finished[run_id] = asyncio.get_running_loop().create_future()
+    started = time.perf_counter()
+    await client.start_workflow(
+        "BaseAgentWorkflow",
+        InvocationParams(user_id=consumer, run_id=run_id, agent_type="consumer"),
+        id=f"consumer_{consumer}_{run_id}",
+        task_queue=TASK_QUEUE,
+        start_signal="agent_msg_signal",
+        start_signal_args=[{"from": "operator", "message": f"INTENT product={random.choice(PRODUCTS)}"}],
+    )
+    finished = await marketplace.finished[run_id]
+    return (finished - started) * 1000
+
+
+async def terminate_runs(client: Client, runs: dict[str, str]) -> None:
+    """Terminate the consumer, issuer and merchant workflows of every run."""
+    workflow_ids = []
+    for run_id, consumer in runs.items():
+        workflow_ids.append(f"consumer_{consumer}_{run_id}")
+        workflow_ids += [f"issuer_{issuer}_{run_id}" for issuer in marketplace.issuers]
+        workflow_ids += [f"merchant_{merchant}_{run_id}" for merchant in marketplace.merchants]
+    semaphore = asyncio.Semaphore(50)
+
+    async def terminate(workflow_id: str) -> None:
+        async with semaphore:
+            try:
+                await client.get_workflow_handle(workflow_id).terminate("load test finished")
+            except RPCError:
+                # Never started (e.g. a timed-out run that did not reach this agent) or already closed.
+                pass
+
+    await asyncio.gather(*(terminate(workflow_id) for workflow_id in workflow_ids))
+
+
+async def run_load(args) -> dict:
+    global marketplace
+    marketplace = Marketplace(args.consumers, args.issuers, args.merchants, args.llm_latency_ms)
+    config_dir = tempfile.mkdtemp(prefix="marketplace-")
+    marketplace.write_configs(config_dir)
+    agent_config_registry.config_dir = config_dir
+    agent_config_registry.invalidate()
+    agent_config_registry.load_all()
+    # Every agent of every run on one shared queue, served by this process.
+    set_task_queue_routing(TaskQueueRouting(mode=SHARED, shared_queue=TASK_QUEUE, fair_scheduling=False))
+
+    env = None
+    # AGENT_FAST_JSON / AGENT_PAYLOAD_COMPRESSION apply here as they do to the agents' workers.
+    data_converter = get_payload_settings().data_converter()
+    if args.address:
+        client = await Client.connect(args.address, data_converter=data_converter)
+    else:
+        env = await WorkflowEnvironment.start_local(data_converter=data_converter)
+        client = env.client
+    set_temporal_client(client)
+    tuning = WorkerTuning(max_concurrent_activities=args.max_activities, max_concurrent_workflow_tasks=args.max_workflow_tasks)
+    monitor = SaturationMonitor(args.max_activities)
+    sampler = asyncio.create_task(monitor.sample())
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # run_id -> consumer, for every run started, so its agents can be terminated afterwards.
+    started_runs: dict[str, str] = {}
+
+    async def one_run(index: int) -> tuple[str, float]:
+        run_id = f"load{index}-{uuid.uuid4().hex[:8]}"
+        consumer = marketplace.consumers[index % len(marketplace.consumers)]
+        async with semaphore:
+            started_runs[run_id] = consumer
+            latency = await asyncio.wait_for(offer_discovery(client, consumer, run_id), timeout=args.run_timeout)
+        return run_id, latency
+
+    try:
+        async with Worker(
+            client,
+            task_queue=TASK_QUEUE,
+            workflows=[BaseAgentWorkflow],
+            activities=[stub_llm_call, load_agent_config, send_message_to_agent_tool, multicast_agent_message, calculator],
+            interceptors=[monitor],
+            **tuning.worker_options(),
+        ):
+            started = time.perf_counter()
+            runs = await asyncio.gather(*(one_run(index) for index in range(args.runs)), return_exceptions=True)
+            elapsed = time.perf_counter() - started
+    finally:
+        sampler.cancel()
+        # Agent workflows never complete on their own; don't leave them running on --address servers.
+        await terminate_runs(client, started_runs)
+        if env is not None:
+            await env.shutdown()
+
+    completed = [run for run in runs if not isinstance(run, BaseException)]
+    latencies = [latency for _, latency in completed]
+    return {
+        "config": vars(args),
+        "runs": args.runs,
+        "completed": len(completed),
+        "failed": len(runs) - len(completed),
+        "elapsed_seconds": elapsed,
+        "runs_per_second": len(completed) / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "messages_per_run": statistics.fmean(marketplace.messages[run_id] for run_id, _ in completed) if completed else 0.0,
+        "llm_calls_per_run": statistics.fmean(marketplace.llm_calls[run_id] for run_id, _ in completed) if completed else 0.0,
+        "worker": monitor.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Marketplace load generator")
+    parser.add_argument("--consumers", type=int, default=10)
+    parser.add_argument("--issuers", type=int, default=2)
+    parser.add_argument("--merchants", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=50, help="offer discovery runs in total")
+    parser.add_argument("--concurrency", type=int, default=10, help="runs in flight at once")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="mean stub LLM latency")
+    parser.add_argument("--max-activities", type=int, default=100, help="worker activity slots")
+    parser.add_argument("--max-workflow-tasks", type=int, default=100, help="worker workflow task slots")
+    parser.add_argument("--run-timeout", type=float, default=120.0, help="seconds before a run counts as failed")
+    parser.add_argument("--address", help="Temporal server to use instead of a local dev server")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+# The framework modules import each other by their flat names, so put framework/ itself on the path.
+FRAMEWORK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../framework"))
+if FRAMEWORK_DIR not in sys.path:
+    sys.path.insert(0, FRAMEWORK_DIR)
+
+import asyncio
+from BaseAgent import start_shared_worker
+
+# Serves consumer, issuer and merchant agents from the shared task queues.
+# Run with AGENT_TASK_QUEUE_MODE=shared (or hashed) set for the workers and for every agent
+# process, after the agent configs have been written by consumer_worker.py etc.
+# Optional arguments: the hashed queues this process should poll, e.g. agents-queue-0 agents-queue-1.
+interrupt_event = asyncio.Event()
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    task_queues = sys.argv[1:] or None
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(start_shared_worker(interrupt_event, task_queues=task_queues))
+    except KeyboardInterrupt:
+        print("Interrupt received, exiting...")
+        interrupt_event.set()
+        loop.run_until_complete(loop.shutdown_asyncgens())
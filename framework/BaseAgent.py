@@ -1,9 +1,21 @@
+import asyncio
 import json
 import os
-from temporalio.client import Client
+from dataclasses import asdict
 from temporalio.worker import Worker
 from BaseAgentWorkflow import BaseAgentWorkflow
-from activities import llm_call, send_message_to_agent_tool, schedule_tool, calculator
+from temporal_client import get_temporal_client
+from llm_client import close_llm_clients, get_llm_settings
+from agent_config import agent_config_registry
+from tool_registry import DEFAULT_TOOL_NAMES, builtin_tool_registry, normalize_tool_schema
+from task_routing import get_task_queue_routing
+from agent_logging import configure_logging, get_logger
+from instrumentation import AgentTelemetryInterceptor, SdkMetricsForwarder, get_exporter, telemetry_enabled
+from payload_codec import PayloadSettings, resolve_payload_settings, set_payload_settings
+from worker_tuning import LLM_ACTIVITY_NAMES, LLM_TASK_QUEUE_SUFFIX, WorkerTuning, polls_llm_task_queue, resolve_worker_tuning
+from activities import llm_call, load_agent_config, summarize_conversation, send_message_to_agent_tool, multicast_agent_message, schedule_tool, calculator, ContinueAsNewPolicy, MessageBatchingPolicy, ToolConcurrencyPolicy, LLMStreamingPolicy, ContextWindowPolicy
+
+log = get_logger("worker")
 
 def ensure_dir(file_path):
     directory = os.path.dirname(file_path)
@@ -33,7 +45,9 @@ def write_json(file_path, data):
     
     with open(file_path, 'w') as json_file:
         json.dump(cleaned_data, json_file, indent=4)
-    print(f"Agent config written to {os.path.abspath(file_path)}")
+    log.info("Agent config written to {path}", path=os.path.abspath(file_path))
+
+AGENT_ACTIVITIES = [llm_call, load_agent_config, summarize_conversation, send_message_to_agent_tool, multicast_agent_message, schedule_tool, calculator]
 
 def __add_context__(system_msg, user_id, agents):
     return f"""
@@ -44,30 +58,50 @@ def __add_context__(system_msg, user_id, agents):
     """
 
 class BaseAgent:
-    def __init__(self, user_id="", system_msg="", agents=None, language="English", agent_type=""):
+    def __init__(
+        self,
+        user_id="",
+        system_msg="",
+        agents=None,
+        language="English",
+        agent_type="",
+        continue_as_new: ContinueAsNewPolicy | None = None,
+        use_message_store=False,
+        message_batching: MessageBatchingPolicy | None = None,
+        tool_concurrency: ToolConcurrencyPolicy | None = None,
+        prompt_caching=True,
+        llm_streaming: LLMStreamingPolicy | None = None,
+        response_cache=True,
+        context_window: ContextWindowPolicy | None = None,
+        worker_tuning: WorkerTuning | str | None = None,
+        payloads: PayloadSettings | str | None = None,
+        tools: list[str] | None = None,
+    ):
         if agents is None:
             agents = {}
+        if continue_as_new is None:
+            continue_as_new = ContinueAsNewPolicy()
+        if message_batching is None:
+            message_batching = MessageBatchingPolicy()
+        if tool_concurrency is None:
+            tool_concurrency = ToolConcurrencyPolicy()
+        if llm_streaming is None:
+            llm_streaming = LLMStreamingPolicy()
+        if context_window is None:
+            context_window = ContextWindowPolicy()
         self.user_id = user_id
         self.agent_type = agent_type
-        self.activities = [llm_call, send_message_to_agent_tool, schedule_tool, calculator]
+        # A WorkerTuning, or a preset name: "llm_heavy" or "fan_out_heavy".
+        self.worker_tuning = resolve_worker_tuning(worker_tuning)
+        # A PayloadSettings, "fast" (orjson + zlib) or "default". Applies to the whole process,
+        # since the worker and the activities share one client; unset, AGENT_FAST_JSON and
+        # AGENT_PAYLOAD_COMPRESSION decide.
+        if payloads is not None:
+            set_payload_settings(resolve_payload_settings(payloads))
+        self.activities = list(AGENT_ACTIVITIES)
         self.additional_tools = []  # Initialize empty list for additional tools
-        self.tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "send_message_to_agent",
-                    "description": "Send a message to another agent",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "agent_id": {"type": "string"},
-                            "message": {"type": "string"}
-                        },
-                        "required": ["agent_id", "message"]
-                    }
-                }
-            }
-        ]  # Initialize with default tools
+        # Built-in tools by name; DEFAULT_TOOL_NAMES (agent and operator messaging) unless given.
+        self.tools = builtin_tool_registry.schemas_for(DEFAULT_TOOL_NAMES if tools is None else tools)
         
         agent_config = {
             "system_msg": __add_context__(system_msg, user_id, agents),
@@ -75,7 +109,18 @@ class BaseAgent:
             "Language": language,
             "user_id": user_id,
             "tools": self.tools,  # Add tools to config
-            "additional_tools": self.additional_tools
+            "additional_tools": self.additional_tools,
+            "continue_as_new": asdict(continue_as_new),
+            "message_store": use_message_store,
+            "message_batching": asdict(message_batching),
+            "tool_concurrency": asdict(tool_concurrency),
+            "prompt_caching": prompt_caching,
+            "llm_streaming": asdict(llm_streaming),
+            # Per-agent opt-out of the worker's LLM response cache (enabled with LLM_RESPONSE_CACHE).
+            "response_cache": response_cache,
+            "context_window": asdict(context_window),
+            # Workflows send llm_call and summarize_conversation to "<task queue>-llm".
+            "llm_task_queue": self.worker_tuning.llm_task_queue
         }
         self.config_path = f"agent_configs/{agent_type}_{user_id}.json"
         write_json(self.config_path, agent_config)
@@ -84,8 +129,10 @@ class BaseAgent:
         """Register a tool configuration for the LLM to use.
         
         Args:
-            tool (dict): Tool configuration with name, description, and parameters
+            tool (dict): Tool configuration with name, description, and input_schema
+                (or parameters). It is executed by the activity with the same name.
         """
+        tool = normalize_tool_schema(tool)
         self.additional_tools.append(tool)
         # Read current config
         with open(self.config_path, 'r') as f:
@@ -98,23 +145,82 @@ class BaseAgent:
         
         # Write updated config
         write_json(self.config_path, config)
-        print(f"Registered new tool: {tool['name']}")
+        log.info("Registered new tool: {tool}", tool=tool["name"])
 
     async def start_worker(self, interrupt_event):
-        import os
-        temporal_address = os.environ.get("TEMPORAL_ADDRESS")
-        client = await Client.connect(temporal_address)
-        worker = Worker(
+        # In shared/hashed task queue mode this agent's queue is polled by the pool; see start_shared_worker.
+        await run_workers(
+            [get_task_queue_routing().task_queue_for(self.user_id)],
+            self.activities,
+            interrupt_event,
+            self.worker_tuning,
+        )
+
+
+async def start_shared_worker(
+    interrupt_event,
+    task_queues=None,
+    worker_tuning: WorkerTuning | str | None = None,
+    payloads: PayloadSettings | str | None = None,
+):
+    """Serve every agent routed to the shared task queues from this process.
+
+    Agent configs are read from agent_configs/ and picked per workflow by its ID, so one
+    pool of workers replaces the per-agent workers. Pass task_queues to poll only some of
+    the hashed queues.
+    """
+    if task_queues is None:
+        task_queues = get_task_queue_routing().pool_task_queues()
+    if payloads is not None:
+        set_payload_settings(resolve_payload_settings(payloads))
+    await run_workers(task_queues, AGENT_ACTIVITIES, interrupt_event, resolve_worker_tuning(worker_tuning))
+
+
+async def run_workers(task_queues, activities, interrupt_event, tuning: WorkerTuning):
+    configure_logging()
+    # With AGENT_TELEMETRY set, trace activities and workflows and forward the SDK's latency histograms.
+    interceptors = []
+    forwarder = None
+    if telemetry_enabled():
+        forwarder = SdkMetricsForwarder()
+        # Has to happen before the client connects.
+        forwarder.install()
+        interceptors.append(AgentTelemetryInterceptor())
+    # The workers and their activities share one connection per process.
+    client = await get_temporal_client()
+    # Read LLM settings once at startup; refresh_llm_clients() re-reads them after a key rotation.
+    get_llm_settings()
+    # Validate and cache every agent config once; workflows get snapshots from the registry.
+    agent_config_registry.load_all()
+    workers = []
+    llm_activities = [a for a in activities if a.__name__ in LLM_ACTIVITY_NAMES]
+    for task_queue in task_queues:
+        # The main worker keeps the LLM activities for agents that do not route them to "-llm".
+        if polls_llm_task_queue(tuning, get_task_queue_routing(), task_queue, agent_config_registry.snapshots()):
+            workers.append(Worker(
+                client,
+                task_queue=task_queue + LLM_TASK_QUEUE_SUFFIX,
+                activities=llm_activities,
+                interceptors=interceptors,
+                **tuning.worker_options(llm=True),
+            ))
+        workers.append(Worker(
             client,
-            task_queue=self.user_id + "-queue",
+            task_queue=task_queue,
             workflows=[BaseAgentWorkflow],
-            activities=[llm_call, send_message_to_agent_tool, schedule_tool, calculator, register_tool_activity],
-        )
-        print(f"Task queue: {self.user_id}-queue")
-        print("\nWorker started, ctrl+c to exit\n")
-        await worker.run()
-        try:
-            await interrupt_event.wait()
-        finally:
-            print("\nShutting down the worker\n")
-                    
\ No newline at end of file
+            activities=activities,
+            interceptors=interceptors,
+            **tuning.worker_options(),
+        ))
+    log.info("Worker started on task queues {task_queues}, ctrl+c to exit", task_queues=", ".join(worker.task_queue for worker in workers))
+    forwarding = asyncio.create_task(forwarder.run()) if forwarder is not None else None
+    try:
+        await asyncio.gather(*(worker.run() for worker in workers))
+        await interrupt_event.wait()
+    finally:
+        log.info("Shutting down the worker")
+        if forwarding is not None:
+            forwarding.cancel()
+            forwarder.drain()
+        get_exporter().flush()
+        await close_llm_clients()
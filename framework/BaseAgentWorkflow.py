@@ -1,97 +1,171 @@
-import _io
 import json
 from typing import Union
 
 from temporalio import workflow
-from tools import send_operator_message, send_agents_message, schedule_reminder, tasks_done
-from wait_for_assistance import wait_for_assistance
 with workflow.unsafe.imports_passed_through():
-    from temporalio.common import datetime 
     from langfuse.decorators import observe
-    open_file = _io.open
+    from message_store import canonical_json, content_hash
+    from tool_registry import LOCAL_ACTIVITY, WORKFLOW, builtin_tool_registry, describe_tool_input_error, input_list, input_str
+    from worker_tuning import LLM_TASK_QUEUE_SUFFIX
+    from instrumentation import workflow_histogram
+    from agent_logging import get_logger
 
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError, ApplicationError
 from datetime import timedelta
+from dataclasses import replace
 import asyncio
 
 from activities import (
 LLMState,
 llm_call,
+load_agent_config,
+summarize_conversation,
+AgentConfigRequest,
+AgentConfigSnapshot,
 AgentMessageParams,
-ScheduleParams,
+MulticastParams,
+SummarizeParams,
 InvocationParams,
-CalculatorParams
+CalculatorParams,
+CarriedState,
+MessagesQuery,
+StateQuery,
+ContinueAsNewPolicy,
+MessageBatchingPolicy,
+ToolConcurrencyPolicy,
+LLMStreamingPolicy,
+ContextWindowPolicy,
+MESSAGE_STORE_MISS
 )
+from conversation import (
+append_message,
+calibrate_token_counts,
+carry_over_state,
+message_page,
+restore_carried_state,
+split_for_compaction,
+take_input_batch,
+update_overhead_tokens
+)
+from context_window import ContextWindowManager
+from reminders import ReminderQueue
+from tool_concurrency import ToolConcurrencyLimiter
+from prompt_cache import cache_usage
 
-from calculator_tool import calculator_tool
-
-def read_json(file_path):
-    print("Reading son from (file_path}")
-    with open_file(file_path, 'r') as json_file:
-        return json.load(json_file)
+log = get_logger("workflow")
+turn_log = get_logger("workflow.turn")
+tool_log = get_logger("workflow.tools")
+signal_log = get_logger("workflow.signal")
+query_log = get_logger("workflow.query")
 
 @workflow.defn
 class BaseAgentWorkflow:
     @workflow.init
     def __init__(self, params: InvocationParams):
-        print(type(params))
-        print(f"BaseAgentWorkflow Init: {params}")
-        agent_config = read_json(f"agent_configs/{params.agent_type}_{params.user_id}.json")
-        print("BaseAgentWorkflow config: (agent_config)")
-        agent_type = params.agent_type
-        agents = agent_config["agents"]
-        language = agent_config["language"]
-        system_message = agent_config["system_msg"]
+        log.debug("BaseAgentWorkflow init {params}", params=params)
         self.input_message_queue = []
         self.user_id = params.user_id
-        
-        # Read config file to get tools
-        config_path = f"agent_configs/{agent_type}_{params.user_id}.json"
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        tools = config.get('tools', [])
-        # Get additional_tools from the config (these are the tools added via register_tool)
-        self.additional_tools = config.get('additional_tools', [])
-        
+        self.telemetry_tags = {"agent_type": params.agent_type, "user_id": params.user_id, "run_id": params.run_id}
+        # Filled in from the agent config snapshot when the run starts; see _apply_config.
+        self.config_version = ""
         self.llm_state = LLMState(
             user_id=params.user_id,
-            persona_type=agent_type,
+            persona_type=params.agent_type,
             run_id=params.run_id,
             messages=[],
-            system_message=system_message,
-            tools=tools,  # Use tools from config
-            agents=agents,
-            language=language
         )
-        print("BaseAgentWorkflow initialized.")
+        # Token usage including prompt-cache reads and writes, for the last turn and summed over this run.
+        self.last_turn_usage = cache_usage(None)
+        self.usage_totals = cache_usage(None)
+        self.last_turn_timing = {}
+        self.turns_this_run = 0
+        # Turns and dropped-from-the-front messages over all runs, so query cursors survive compaction.
+        self.total_turns = 0
+        self.message_offset = 0
+        # Driven by durable workflow timers; see _run_reminders.
+        self.reminders = ReminderQueue()
+        # Content hashes this run has already handed to the message store, and per-object digest caches.
+        self.stored_refs = set()
+        self.message_digests = {}
+        self.static_digests = {}
+
+        carried_state = params.carried_state
+        if carried_state is not None:
+            restore_carried_state(self.llm_state, carried_state.llm_state)
+            self.input_message_queue = list(carried_state.input_message_queue)
+            self.message_offset = carried_state.message_offset
+            self.total_turns = carried_state.total_turns
+            self.reminders = ReminderQueue(carried_state.pending_reminders)
+            log.info(
+                "Continued with {messages} messages and {queued} queued inputs",
+                messages=len(self.llm_state.messages),
+                queued=len(self.input_message_queue),
+            )
+
+    def _apply_config(self, agent_config: AgentConfigSnapshot):
+        log.info("Config version {version}", version=agent_config.version, user_id=self.user_id)
+        self.config_version = agent_config.version
+        config = agent_config.settings
+        self.llm_state.system_message = agent_config.system_msg
+        # Schemas are validated and frozen once per run; tool calls are dispatched by name lookup.
+        self.tool_registry = builtin_tool_registry.for_agent(agent_config.tools, agent_config.additional_tools)
+        self.llm_state.tools = self.tool_registry.schemas()
+        self.llm_state.agents = agent_config.agents
+        self.llm_state.language = agent_config.language
+        self.llm_state.prompt_caching = config.get("prompt_caching", True)
+        self.llm_state.response_cache = config.get("response_cache", True)
+        self.llm_streaming = LLMStreamingPolicy(**config.get("llm_streaming", {}))
+        self.llm_state.stream = self.llm_streaming.enabled
+        self.context_window = ContextWindowManager(ContextWindowPolicy(**config.get("context_window", {})))
+        self.continue_as_new_policy = ContinueAsNewPolicy(**config.get("continue_as_new", {}))
+        self.message_batching = MessageBatchingPolicy(**config.get("message_batching", {}))
+        self.tool_concurrency = ToolConcurrencyPolicy(**config.get("tool_concurrency", {}))
+        self.tool_limiter = ToolConcurrencyLimiter(self.tool_concurrency)
+        self.use_message_store = config.get("message_store", False)
+        # None keeps LLM activities on the workflow's own task queue.
+        self.llm_task_queue = workflow.info().task_queue + LLM_TASK_QUEUE_SUFFIX if config.get("llm_task_queue", False) else None
+        update_overhead_tokens(self.llm_state)
 
     @workflow.run
     async def _run_(self, params: InvocationParams) -> dict:
-        print("BaseAgentWorkflow Run:", params)
+        log.info("Run started for {user_id}", user_id=params.user_id, agent_type=params.agent_type, run_id=params.run_id)
+        # The worker's config registry serves the snapshot; the result is recorded, so replays never touch disk.
+        agent_config = await workflow.execute_local_activity(
+            load_agent_config,
+            AgentConfigRequest(
+                agent_type=params.agent_type,
+                user_id=params.user_id,
+                workflow_id=workflow.info().workflow_id,
+            ),
+            start_to_close_timeout=timedelta(seconds=10),
+        )
+        self._apply_config(agent_config)
+        asyncio.create_task(self._run_reminders())
         while True:
             await self._wait_for_new_message()
 
             self._record_message_in_conversation_history()
-            llm_response = await workflow.execute_activity(
-                llm_call,
-                self.llm_state,
-                schedule_to_close_timeout=timedelta(seconds=68),
-                retry_policy = RetryPolicy(maximum_attempts=1),
-            )
+            llm_response = await self._call_llm()
+            self._record_usage(llm_response)
+            self.last_turn_timing = llm_response.get("timing", {})
             #TODO: Need to figure out what is this doing!!.....
             llm_response = {k: v for k, v in llm_response.items() if k in ["role", "content"]}
+            tool_use_blocks = [part for part in llm_response["content"] if part["type"] == "tool_use"]
             llm_response["content"] = [
                 {
                     "type": "text",
                     "text": "<thinking I will call response tool.</thinking>",
                 },
-                llm_response["content"][0],
+                *(tool_use_blocks or llm_response["content"][:1]),
             ]
-            self.llm_state.messages.append(llm_response)
+            append_message(self.llm_state, llm_response, tokens=self.last_turn_usage["output_tokens"] or None)
+            self.turns_this_run += 1
+            self.total_turns += 1
             # Filter a python array.
-            tool_id, tool_response_string = await self._invoke_tools_(llm_response, params) #print("TOOL RESPONSE", tool_response_string, tool_id)
-            self.llm_state.messages.append(
+            tool_results = await self._invoke_tools_(llm_response, params)
+            append_message(
+                self.llm_state,
                 {
                     "role": "user",
                     "content":[
@@ -99,147 +173,463 @@ class BaseAgentWorkflow:
                             "type": "text",
                             "text": "Here is the tool response.",
                         },
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": tool_id,
-                            #"content":[{"type": "text", "text": tool response_string)),
-                            "content": tool_response_string,
-                        },
+                        *(
+                            {
+                                "type": "tool_result",
+                                "tool_use_id": tool_id,
+                                "content": tool_response_string,
+                                **({"is_error": True} if is_error else {}),
+                            }
+                            for tool_id, tool_response_string, is_error in tool_results
+                        ),
                     ],
                 },
             )
-    
-    async def _invoke_tools_(self, llm_response, params):
-        # Extract all tool calls from the LLM response
-        tool_call_contexts_in_llm_responses = [llm_response_part for llm_response_part in llm_response["content"] if llm_response_part["type"] == "tool_use"]
-        tool_response_string = ""
-        tool_id = None
-        print(f"Total tools to call: {len(tool_call_contexts_in_llm_responses)}")
-
-        for tool_call_llm_response in tool_call_contexts_in_llm_responses:
-            thinking = tool_call_llm_response["input"].get("thinking", None) 
-            agent_messages = tool_call_llm_response["input"].get("agent messages", []) 
-            operator_message = tool_call_llm_response["input"].get("operator message", None)
-            schedule_reminder_time = tool_call_llm_response("input").get("time", None)
-            tool_input = tool_call_llm_response.get("input", {})
-            tool_name = tool_call_llm_response.get("name")
-            print("all additional tools: ", self.additional_tools)
-            if tool_name in self.additional_tools:
-                print(f"Calling additional tool: {tool_name}")
-                tool_params = {
-                    **tool_input
-                }
-                
-                # Execute the tool activity
-                result = await workflow.execute_activity(
-                    tool_name,
-                    tool_params,
-                    schedule_to_close_timeout=timedelta(hours=2),
-                    retry_policy=RetryPolicy(maximum_attempts=1),
-                )
-                tool_response_string += result
-            if thinking:
-                print("Thinking:", thinking)
-            if agent_messages:
-                print("Total agent messages: (len agent_nessages") 
-                print("Collated agent messages: (agent messages)")
-            if type(agent_messages) == str:
-                agent_messages = json.loads(agent_messages)
-            for each_agent_message in agent_messages:
-                print("Agent Message:", each_agent_message)
-                to_id = each_agent_message["to_id"]
-                agent_type = each_agent_message["agent_type"]
-                llm_response = each_agent_message("message")
-                agent_message_params = AgentMessageParams(
-                    to_id=to_id,
-                    message=llm_response,
-                    user_id=self.user_id,
-                    run_id= params.run_id,
-                    agents=self.llm_state.agents,
-                    agent_type=agent_type,
-                )
+            if self._should_continue_as_new():
+                await self._continue_as_new(params)
 
-                result = await workflow.execute_activity(
-                    "send_message_to_agent_tool",
-                    agent_message_params,
-                    schedule_to_close_timeout=timedelta(hours=2),
-                    retry_policy = RetryPolicy(maximum_attempts=1),
-                )
+    async def _call_llm(self) -> dict:
+        started = workflow.now()
+        message_count = len(self.llm_state.messages)
+        llm_state = await self.context_window.prepare(self.llm_state, self._summarize)
+        # A summarizing context window drops the oldest turns from the conversation itself.
+        self.message_offset += message_count - len(self.llm_state.messages)
+        llm_response = await self._call_llm_with_state(llm_state)
+        workflow_histogram("agent_llm_turn_ms", (workflow.now() - started) / timedelta(milliseconds=1), self.telemetry_tags)
+        # A response-cache hit reports zero usage; its cached_usage still gives the prompt's size.
+        reported_usage = llm_response.get("cached_usage") or llm_response.get("usage")
+        if llm_state is self.llm_state and reported_usage:
+            # The request held the whole conversation, so its reported size corrects the cached counts.
+            usage = cache_usage(reported_usage)
+            calibrate_token_counts(
+                self.llm_state,
+                usage["input_tokens"] + usage["cache_creation_input_tokens"] + usage["cache_read_input_tokens"],
+            )
+        return llm_response
 
-                tool_response_string = result
-            
-            if operator_message:
-                print("Operator Message: ", operator_message)
-                tool_response_string += "Your operator has been notified,"
-
-            if schedule_reminder_time:
-                schedule_reminder_message = tool_call_llm_response["input"].get( "llm_response", None)
-                schedule_params = ScheduleParams(
-                time = schedule_reminder_time,
-                message=schedule_reminder_message,
-                user_id=self.user_id,
-                persona_type=self.llm_state.persona_type,
+    async def _call_llm_with_state(self, llm_state: LLMState) -> dict:
+        if not self.use_message_store:
+            return await self._execute_llm_call(llm_state)
+        llm_input = self._llm_call_reference(llm_state)
+        try:
+            llm_response = await self._execute_llm_call(llm_input)
+        except ActivityError as e:
+            if not (isinstance(e.cause, ApplicationError) and e.cause.type == MESSAGE_STORE_MISS):
+                raise
+            # The worker's store does not have what we sent before (lost, or a different host), so resend all blobs.
+            log.warning("Message store miss, resending all conversation blobs", user_id=self.user_id)
+            self.stored_refs.clear()
+            llm_input = self._llm_call_reference(llm_state)
+            llm_response = await self._execute_llm_call(llm_input)
+        self.stored_refs.update(llm_input.blobs)
+        return llm_response
+
+    async def _execute_llm_call(self, llm_input: LLMState) -> dict:
+        streaming = self.llm_streaming
+        if streaming.enabled:
+            # A streamed call may run long as long as it keeps making progress.
+            return await workflow.execute_activity(
+                llm_call,
+                llm_input,
+                task_queue=self.llm_task_queue,
+                start_to_close_timeout=timedelta(minutes=streaming.start_to_close_timeout_minutes),
+                heartbeat_timeout=timedelta(seconds=streaming.heartbeat_timeout_seconds),
+                retry_policy=RetryPolicy(maximum_attempts=streaming.maximum_attempts),
+            )
+        return await workflow.execute_activity(
+            llm_call,
+            llm_input,
+            task_queue=self.llm_task_queue,
+            schedule_to_close_timeout=timedelta(seconds=68),
+            retry_policy = RetryPolicy(maximum_attempts=1),
+        )
+
+    def _llm_call_reference(self, llm_state: LLMState) -> LLMState:
+        """Build the llm_call input as a manifest of content hashes plus the blobs the store is missing."""
+        blobs = {}
+
+        def ref(obj, cached):
+            if cached is not None and cached[0] is obj:
+                digest = cached[1]
+                if digest not in self.stored_refs:
+                    blobs[digest] = canonical_json(obj)
+                return digest, cached
+            body = canonical_json(obj)
+            digest = content_hash(body)
+            if digest not in self.stored_refs:
+                blobs[digest] = body
+            return digest, (obj, digest)
+
+        system_ref, self.static_digests["system"] = ref(llm_state.system_message, self.static_digests.get("system"))
+        tools_ref, self.static_digests["tools"] = ref(llm_state.tools, self.static_digests.get("tools"))
+
+        # Keyed by object identity; the cached object is checked so a reused id cannot match.
+        message_digests = {}
+        message_refs = []
+        for message in llm_state.messages:
+            digest, message_digests[id(message)] = ref(message, self.message_digests.get(id(message)))
+            message_refs.append(digest)
+        self.message_digests = message_digests
+
+        return replace(
+            llm_state,
+            system_message="",
+            tools=[],
+            messages=[],
+            message_tokens=[],
+            system_ref=system_ref,
+            tools_ref=tools_ref,
+            message_refs=message_refs,
+            blobs=blobs,
+        )
+
+    async def _summarize(self, messages: list[dict], previous_summary: str) -> str:
+        return await workflow.execute_activity(
+            summarize_conversation,
+            SummarizeParams(
+                messages=messages,
+                previous_summary=previous_summary,
+                language=self.llm_state.language,
+            ),
+            task_queue=self.llm_task_queue,
+            start_to_close_timeout=timedelta(minutes=2),
+            retry_policy=RetryPolicy(maximum_attempts=3),
+        )
+
+    def _record_usage(self, llm_response: dict):
+        if llm_response.get("timing", {}).get("cached"):
+            # Served from the response cache: no tokens were spent.
+            self.last_turn_usage = cache_usage(None)
+            turn_log.info("Turn {turn} served from the response cache", turn=self.turns_this_run + 1, user_id=self.user_id)
+            return
+        self.last_turn_usage = cache_usage(llm_response.get("usage"))
+        for key, value in self.last_turn_usage.items():
+            self.usage_totals[key] += value
+        turn_log.info(
+            "Turn {turn} tokens: cache_read={cache_read} cache_write={cache_write} uncached_input={uncached_input}",
+            turn=self.turns_this_run + 1,
+            cache_read=self.last_turn_usage["cache_read_input_tokens"],
+            cache_write=self.last_turn_usage["cache_creation_input_tokens"],
+            uncached_input=self.last_turn_usage["input_tokens"],
+            user_id=self.user_id,
+        )
+
+    def _should_continue_as_new(self) -> bool:
+        policy = self.continue_as_new_policy
+        if not policy.enabled:
+            return False
+        info = workflow.info()
+        return (
+            info.is_continue_as_new_suggested()
+            or info.get_current_history_length() >= policy.max_history_events
+            or info.get_current_history_size() >= policy.max_history_bytes
+            or self.turns_this_run >= policy.max_turns
+        )
+
+    async def _continue_as_new(self, params: InvocationParams):
+        """Compact the conversation to a summary plus the last N turns and continue in a new run."""
+        older, recent = split_for_compaction(
+            self.llm_state.messages, self.continue_as_new_policy.keep_last_turns
+        )
+        summary = self.llm_state.summary
+        if older:
+            summary = await self._summarize(older, summary)
+        await workflow.wait_condition(workflow.all_handlers_finished)
+
+        log.info("Continuing as new: {summarized} messages summarized, {kept} kept", summarized=len(older), kept=len(recent))
+        workflow.continue_as_new(
+            InvocationParams(
+                user_id=params.user_id,
                 run_id=params.run_id,
-                )
-                asyncio.create_task(
-                    workflow.execute_activity(
-                    "schedule tool",
-                    schedule_params,
-                    schedule_to_close_timeout=timedelta(hours=2),
-                    retry_policy=RetryPolicy(maximum_attempts=1),
+                agent_type=params.agent_type,
+                carried_state=CarriedState(
+                    llm_state=carry_over_state(self.llm_state, len(older), summary),
+                    input_message_queue=list(self.input_message_queue),
+                    pending_reminders=self.reminders.pending(),
+                    message_offset=self.message_offset + len(older),
+                    total_turns=self.total_turns,
+                ),
+            )
+        )
+
+    async def _run_reminders(self):
+        """Move due reminders into input_message_queue. Timers are durable, so reminders survive worker restarts."""
+        while True:
+            await workflow.wait_condition(lambda: bool(self.reminders))
+            next_due_at = self.reminders.next_due_at()
+            delay = next_due_at - workflow.now().timestamp()
+            if delay > 0:
+                try:
+                    # Wake early if an earlier reminder is added while we sleep.
+                    await workflow.wait_condition(
+                        lambda: self.reminders.next_due_at() < next_due_at,
+                        timeout=timedelta(seconds=delay),
                     )
-                )
-                tool_response_string += "Reminder set." 
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            reminder = self.reminders.pop()
+            log.debug("Reminder due: {message}", message=reminder["message"])
+            workflow_histogram("agent_reminder_lag_ms", -delay * 1000, self.telemetry_tags)
+            self.input_message_queue.append({
+                "from": "reminder",
+                "message": f"message scheduled {reminder['time']} seconds ago: {reminder['message']}",
+                "sent_at": workflow.now().timestamp(),
+            })
+
+    async def _invoke_tools_(self, llm_response, params) -> list[tuple[str, str, bool]]:
+        """Run every tool_use block concurrently and return (tool_use_id, result, is_error) in block order."""
+        tool_calls = [llm_response_part for llm_response_part in llm_response["content"] if llm_response_part["type"] == "tool_use"]
+        tool_log.debug("Tools to call: {count}", count=len(tool_calls))
+        results = await asyncio.gather(
+            *(self._invoke_tool(tool_call, params) for tool_call in tool_calls)
+        )
+        return [(tool_call["id"], *result) for tool_call, result in zip(tool_calls, results)]
+
+    async def _invoke_tool(self, tool_call_llm_response, params) -> tuple[str, bool]:
+        """The tool's result and whether it is an error the model should see and correct."""
+        tool_input = tool_call_llm_response.get("input", {})
+        tool_name = tool_call_llm_response.get("name")
+        if not isinstance(tool_input, dict):
+            return f"Invalid input for {tool_name}: expected an object", True
+        thinking = tool_input.get("thinking", None)
+        if thinking:
+            tool_log.debug("Thinking: {thinking}", thinking=thinking)
+
+        tool = self.tool_registry.get(tool_name)
+        if tool is None:
+            tool_log.warning("Unknown tool: {tool}", tool=tool_name)
+            return f"Unknown tool: {tool_name}", True
+        started = workflow.now()
+        try:
+            result = await self._dispatch_tool(tool.handler, tool_input, params)
+        except (KeyError, TypeError, ValueError) as e:
+            # Malformed model input. Raised in workflow code it would fail the workflow task, which
+            # is retried forever; as a tool error the model can correct the call on its next turn.
+            tool_log.warning("Invalid input for {tool}: {error}", tool=tool_name, error=repr(e), user_id=self.user_id)
+            return f"Invalid input for {tool_name}: {describe_tool_input_error(e)}", True
+        workflow_histogram(
+            "agent_tool_dispatch_ms",
+            (workflow.now() - started) / timedelta(milliseconds=1),
+            {**self.telemetry_tags, "tool": tool_name, "kind": tool.handler.kind},
+        )
+        return result, False
+
+    async def _dispatch_tool(self, handler, tool_input: dict, params) -> str:
+        if handler.kind == WORKFLOW:
+            return await getattr(self, handler.target)(tool_input, params)
+        if handler.kind == LOCAL_ACTIVITY:
+            return await workflow.execute_local_activity(
+                handler.target,
+                {**tool_input},
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=RetryPolicy(maximum_attempts=1),
+            )
+        tool_log.debug("Calling tool activity: {activity}", activity=handler.target)
+        return await self._execute_tool_activity(handler.target, {**tool_input})
+
+    async def _send_agent_messages(self, tool_input: dict, params) -> str:
+        agent_messages = input_list(tool_input, "agent_messages", dict)
+        tool_log.debug("Agent messages: {count}", count=len(agent_messages))
+        activity_calls = []
+        # Build every message before sending any, so invalid input sends none of them.
+        agent_message_params = [
+            AgentMessageParams(
+                to_id=input_str(each_agent_message, "to_id"),
+                message=input_str(each_agent_message, "message"),
+                user_id=self.user_id,
+                run_id=params.run_id,
+                agent_type=str(each_agent_message.get("agent_type", "")),
+            )
+            for each_agent_message in agent_messages
+        ]
+        for each_agent_message in agent_message_params:
+            tool_log.debug("Agent message: {message}", message=each_agent_message)
+            activity_calls.append(
+                self._execute_tool_activity("send_message_to_agent_tool", each_agent_message)
+            )
+        return "".join(await asyncio.gather(*activity_calls))
+
+    async def _multicast_agent_message(self, tool_input: dict, params) -> str:
+        to_ids = input_list(tool_input, "to_ids", str)
+        multicast_params = MulticastParams(
+            message=input_str(tool_input, "message"),
+            run_id=params.run_id,
+            user_id=self.user_id,
+            sender_type=params.agent_type,
+            to_ids=to_ids,
+            agent_type=str(tool_input.get("agent_type", "")),
+            max_parallel=self.tool_concurrency.max_concurrent,
+        )
+        # One activity for all recipients; it reports delivery per recipient.
+        return await self._execute_tool_activity("multicast_agent_message", multicast_params)
+
+    async def _notify_operator(self, tool_input: dict, params) -> str:
+        tool_log.info("Operator message: {message}", message=tool_input.get("operator_message"), user_id=self.user_id)
+        return "Your operator has been notified,"
+
+    async def _schedule_reminder(self, tool_input: dict, params) -> str:
+        # int() also accepts "60", which models sometimes send for an integer field.
+        schedule_reminder_time = int(tool_input["time"])
+        if schedule_reminder_time < 0:
+            raise ValueError("time must be a non-negative number of seconds")
+        self.reminders.add(
+            workflow.now().timestamp() + schedule_reminder_time,
+            schedule_reminder_time,
+            tool_input.get("message", None),
+        )
+        return "Reminder set."
+
+    async def _wait_for_assistance(self, tool_input: dict, params) -> str:
+        tool_log.info("Waiting for assistance: {message}", message=tool_input.get("wait_message"), user_id=self.user_id)
+        return "Your operator has been notified, wait for their reply."
+
+    async def _execute_tool_activity(self, activity_name: str, activity_input) -> str:
+        async with self.tool_limiter.slot(activity_name):
+            return await workflow.execute_activity(
+                activity_name,
+                activity_input,
+                schedule_to_close_timeout=timedelta(hours=2),
+                retry_policy=RetryPolicy(maximum_attempts=1),
+            )
 
-        return tool_id, tool_response_string
-                    
-    async def wait_for_new_message(self):
+    async def _wait_for_new_message(self):
         await workflow.wait_condition(
             lambda: bool(self.input_message_queue)
         )
-    
-    def record_message_in_conversation_history(self):
-        time_str = datetime.now().strftime("Ymd H:%M:%S")
-        if bool(self.input_message_queue):
-            input_message = self.input_message_queue.pop()
-            signal_msg={
-                "from": "agent",
+        batching = self.message_batching
+        if batching.enabled and len(self.input_message_queue) < batching.max_batch:
+            # Give near-simultaneous replies (e.g. quotes from several merchants) a chance to arrive
+            # so they are answered in one LLM turn.
+            try:
+                await workflow.wait_condition(
+                    lambda: len(self.input_message_queue) >= batching.max_batch,
+                    timeout=timedelta(seconds=batching.debounce_seconds),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _record_message_in_conversation_history(self):
+        time_str = workflow.now().strftime("%Y-%m-%d %H:%M:%S")
+        if not self.input_message_queue:
+            return
+        batch = take_input_batch(self.input_message_queue, self.message_batching)
+        for input_message in batch:
+            if isinstance(input_message, dict) and isinstance(input_message.get("sent_at"), (int, float)):
+                workflow_histogram(
+                    "agent_message_queue_wait_ms",
+                    (workflow.now().timestamp() - input_message["sent_at"]) * 1000,
+                    {**self.telemetry_tags, "from": input_message.get("from", "")},
+                )
+        signal_msgs = [self._format_input_message(input_message, time_str) for input_message in batch]
+        append_message(
+            self.llm_state,
+            {"role": "user", "content": json.dumps(signal_msgs[0] if len(signal_msgs) == 1 else signal_msgs, indent=2)},
+        )
+
+    def _format_input_message(self, input_message, time_str: str) -> dict:
+        signal_msg={
+            "from": "agent",
             "current time": time_str
-            }
+        }
+
+        if "from" in input_message:
+            signal_msg["agent_id"] = input_message["from"]
+        if "message" in input_message:
+            signal_msg["message"] = input_message["message"]
+        else:
+            signal_msg["message"] = input_message
+        return signal_msg
+
+    @workflow.query
+    def get_token_count(self) -> dict:
+        """Current context size from the cached per-message counts."""
+        return {
+            "messages": len(self.llm_state.messages),
+            "message_tokens": self.llm_state.token_total,
+            "overhead_tokens": self.llm_state.overhead_tokens,
+            "total_tokens": self.llm_state.token_total + self.llm_state.overhead_tokens,
+        }
+
+    @workflow.query
+    def get_summary(self) -> dict:
+        """Small status for dashboards; poll get_messages for the conversation itself."""
+        return {
+            "config_version": self.config_version,
+            "turns": self.total_turns,
+            "turns_this_run": self.turns_this_run,
+            "messages": self.message_offset + len(self.llm_state.messages),
+            "first_message": self.message_offset,
+            "message_tokens": self.llm_state.token_total,
+            "overhead_tokens": self.llm_state.overhead_tokens,
+            "usage_totals": self.usage_totals,
+            "last_turn_usage": self.last_turn_usage,
+            "queued_inputs": len(self.input_message_queue),
+            "pending_reminders": len(self.reminders),
+            "next_reminder_at": self.reminders.next_due_at(),
+            "has_summary": bool(self.llm_state.summary),
+        }
 
-            if "from" in input_message:
-                signal_msg["agent_id"] = input_message["from"]
-            if "message" in input_message:
-                signal_msg["message"] = input_message["message"]
+    @workflow.query
+    def get_messages(self, query: MessagesQuery) -> dict:
+        """Messages from query.cursor on, at most query.limit of them.
+
+        Cursors count from the start of the agent's conversation, across compaction and
+        continue-as-new. If older messages were summarized away, reading resumes at the oldest
+        one still held and truncated is set.
+        """
+        return message_page(self.llm_state.messages, self.message_offset, query.cursor, query.limit)
+
+    @workflow.query
+    def get_state_fields(self, query: StateQuery) -> dict:
+        """Only the requested fields of get_state."""
+        extra = {
+            "last_turn_usage": self.last_turn_usage,
+            "usage_totals": self.usage_totals,
+            "last_turn_timing": self.last_turn_timing,
+            "config_version": self.config_version,
+        }
+        selected = {}
+        for name in query.fields:
+            if name in extra:
+                selected[name] = extra[name]
+            elif name in self.llm_state.__dataclass_fields__:
+                selected[name] = getattr(self.llm_state, name)
             else:
-                signal_msg["message"] = input_message
-            self.llm_state.messages.append(
-                {"role": "user", "content": json.dumps(signal_msg, indent=2)}
-            )
+                raise ApplicationError(f"Unknown state field: {name}")
+        return selected
+
     @workflow.query
     def get_state(self) -> str:
-        print("Querying state", self.llm_state)
+        query_log.debug("Querying state", messages=len(self.llm_state.messages))
         state_dict={}
         for field in self.llm_state.__dataclass_fields__ :
             state_dict[field]= getattr(self.llm_state, field)
+        state_dict["last_turn_usage"] = self.last_turn_usage
+        state_dict["usage_totals"] = self.usage_totals
+        state_dict["last_turn_timing"] = self.last_turn_timing
+        state_dict["config_version"] = self.config_version
         return json.dumps(state_dict, indent=2)
     
     @workflow.signal
     def agent_msg_signal(self, received_message: Union [str, dict]) -> None:
-        if isinstance(received_message, dict):
-            print(f"Input is a dictionary: (received message)")
-        #Process the dictionary
-        elif isinstance(received_message, str):
-            print("Input is a string (received_message)")
-        #Process the string
         #A Signal sandler mutates the Workflow state but cannot return a value.
-        print("received Agent message: ", received_message)
-        self. input_message_queue.append(received_message)
+        signal_log.debug("Received agent message: {message}", message=received_message)
+        self.input_message_queue.append(received_message)
+
+    @workflow.signal
+    def scheduled_message_signal(self, message: str) -> None:
+        """Signal handler for reminders still sent by the legacy schedule_tool activity"""
+        signal_log.debug("Received scheduled reminder: {message}", message=message)
+        self.input_message_queue.append({
+            "from": "reminder",
+            "message": message
+        })
 
     @workflow.signal
     def cal_message_signal(self, message: str) -> None:
         """Signal handler for calculator messages"""
-        print("Received calculator message:", message)
+        signal_log.debug("Received calculator message: {message}", message=message)
         self.input_message_queue.append({
             "from": "calculator",
             "message": message
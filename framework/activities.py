@@ -1,179 +1,295 @@
 import asyncio
-from dataclasses import dataclass, field
+import json
+import time
+from dataclasses import replace
 from dotenv import load_dotenv
 from langfuse.decorators import observe
 from temporalio import activity
-from temporalio.client import WorkflowExecutionStatus
+from temporalio.common import WorkflowIDReusePolicy
+from temporalio.exceptions import ApplicationError
+from temporalio.service import RPCError
+from temporal_client import get_temporal_client, invalidate_temporal_client
+from task_routing import get_task_queue_routing
+from agent_logging import get_logger
+# Also imported from here by the workflow, the workers and the benchmarks.
+from workflow_types import (
+    LLMState,
+    ContinueAsNewPolicy,
+    MessageBatchingPolicy,
+    ToolConcurrencyPolicy,
+    LLMStreamingPolicy,
+    ContextWindowPolicy,
+    CarriedState,
+    MessagesQuery,
+    StateQuery,
+    InvocationParams,
+    AgentConfigSnapshot,
+    AgentConfigRequest,
+    UserMessageParams,
+    AgentMessageParams,
+    MulticastParams,
+    ScheduleParams,
+    ModelOutputParams,
+    CalculatorParams,
+    SummarizeParams,
+)
+
+llm_log = get_logger("llm")
+# Full model responses; enable with AGENT_LOG_LEVEL=DEBUG, and sample with AGENT_LOG_SAMPLING=llm.response=0.01.
+response_log = get_logger("llm.response")
+activity_log = get_logger("activity")
 load_dotenv()
 
-@dataclass
-class InvocationParams:
-    user_id: str
-    run_id: str
-    agent_type: str
-
-@dataclass
-class LLMState:
-    user_id: str = ""
-    persona_type: str = ""
-    run_id: str = ""
-    system_message: str = ""
-    language: str = ""
-    messages: list[dict] = field(default_factory=list)
-    tools: list [dict] = field(default_factory=list)
-    agents: dict = field(default_factory=dict)
-    #response format: dict | None = None
-
-@dataclass
-class UserMessageParams:
-    message: str
-    user_id: str
-
-@dataclass
-class AgentMessageParans:
-    to_id: str
-    message: str
-    run_id: str
-    agent_type: str
-    user_id: str = ""
-    agents: dict = field(default_factory=dict)
-
-@dataclass
-class ScheduleParams:
-    time: int
-    message: str
-    user_id: str = ""
-    run_id: str = ""
-    persona_type: str = ""
-
-@dataclass
-class ModelOutputParams:
-    contemplation: str
-    colleague_messages: list [dict[str, str]] = field(default_factory=list)
-    user_message: str | None = None
-
-@dataclass
-class CalculatorParams:
-    """A calculator that can evaluate basic mathematical expressions"""
-    
-    expression: str
+MESSAGE_STORE_MISS = "MessageStoreMiss"
+
+def rehydrate_llm_state(params: LLMState) -> LLMState:
+    """Resolve the content hashes in params against the worker's MessageStore."""
+    if not params.message_refs and not params.system_ref and not params.tools_ref:
+        return params
+    from message_store import get_message_store
+    store = get_message_store()
+    store.put_many(params.blobs)
+    refs = [ref for ref in [params.system_ref, params.tools_ref, *params.message_refs] if ref]
+    blobs = dict(params.blobs)
+    blobs.update(store.get_many([ref for ref in refs if ref not in blobs]))
+    missing = [ref for ref in refs if ref not in blobs]
+    if missing:
+        raise ApplicationError(
+            f"{len(missing)} conversation blobs missing from the message store",
+            missing,
+            type=MESSAGE_STORE_MISS,
+            non_retryable=True,
+        )
+    return replace(
+        params,
+        system_message=json.loads(blobs[params.system_ref]) if params.system_ref else params.system_message,
+        tools=json.loads(blobs[params.tools_ref]) if params.tools_ref else params.tools,
+        messages=[json.loads(blobs[ref]) for ref in params.message_refs] or params.messages,
+        system_ref="",
+        tools_ref="",
+        message_refs=[],
+        blobs={},
+    )
 
 @observe
 @activity.defn
 async def llm_call(params: LLMState) -> dict:
-    from anthropic import AsyncAnthropic
     from anthropic.types import ToolChoiceParam
-    import os
-    from dotenv import load_dotenv
-    load_dotenv(override=True)
-    client = AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"), base_url=os.environ.get("ANTHROPIC_API_BASE_URL")) #params.tools[0]["input_schema"]["properties"]["agent_messages"]["items"] ["properties"]["to_id"[{"enum") = params.agents
+    from llm_client import get_llm_client, get_llm_settings
+    from prompt_cache import cache_usage, cached_messages, cached_tools, system_blocks
+    from llm_cache import cache_hit_response, get_response_cache, response_cache_key
+    if params.message_refs or params.system_ref or params.tools_ref:
+        # SQLite commits or one file write per blob: keep them off the event loop other activities share.
+        params = await asyncio.to_thread(rehydrate_llm_state, params)
+    # Shared per worker so the HTTP connection pool survives across turns.
+    client = get_llm_client()
     tool_choice: ToolChoiceParam = {
         "type": "any",
         "disable_parallel_tool_use": False
     }
+    system_message = params.system_message
+    if params.summary:
+        system_message += f"\n\nSummary of the earlier conversation:\n{params.summary}"
 
-    message = await client.messages.create(
-    model = "claude-3-5-sonnet-20241022",
-    max_tokens = 8000,
+    settings = get_llm_settings()
+    max_tokens = 8000
+    response_cache = get_response_cache() if params.response_cache else None
+    if response_cache is not None:
+        cache_key = response_cache_key(settings.model, system_message, params.tools, params.messages, max_tokens)
+        # SQLite reads and writes; run them in a thread like the message store.
+        cached = await asyncio.to_thread(response_cache.get, cache_key)
+        if cached is not None:
+            llm_log.info("LLM response cache hit", stats=response_cache.stats, user_id=params.user_id)
+            return cache_hit_response(cached)
+
+    cache = params.prompt_caching
+    request = dict(
+    model = settings.model,
+    max_tokens = max_tokens,
     temperature = 0.0,
-    parameters = params.system_message,
-    messages = params.messages,
-    tools = params.tools,
+    system = system_blocks(params.system_message, params.summary, cache=cache),
+    messages = cached_messages(params.messages) if cache else params.messages,
+    tools = cached_tools(params.tools) if cache else params.tools,
     tool_choice = tool_choice,
     )
-    print(f"Initial response: {message.model_dump_json(indent=2)}")
-    await client.close()
-    return message.model_dump()
+    if params.stream:
+        message, timing = await _stream_message(client, request)
+    else:
+        started = time.monotonic()
+        message = await client.messages.create(**request)
+        timing = {"streamed": False, "duration_ms": (time.monotonic() - started) * 1000}
+    usage = cache_usage(message.usage.model_dump())
+    llm_log.info(
+        "Turn usage: input={input_tokens} output={output_tokens} cache_read={cache_read} cache_write={cache_write}",
+        input_tokens=usage["input_tokens"],
+        output_tokens=usage["output_tokens"],
+        cache_read=usage["cache_read_input_tokens"],
+        cache_write=usage["cache_creation_input_tokens"],
+        timing=timing,
+        user_id=params.user_id,
+        run_id=params.run_id,
+    )
+    response_log.debug("Response {id}", id=message.id, response=message.model_dump_json)
+    response = message.model_dump()
+    if response_cache is not None:
+        await asyncio.to_thread(response_cache.put, cache_key, response)
+    return {**response, "timing": timing}
+
+async def _stream_message(client, request: dict):
+    """Consume a streamed response, heartbeating as it arrives, and measure time to first token."""
+    started = time.monotonic()
+    first_token_at = None
+    last_heartbeat = started
+    events = 0
+    activity.heartbeat({"events": events})
+    async with client.messages.stream(**request) as stream:
+        async for event in stream:
+            events += 1
+            now = time.monotonic()
+            if first_token_at is None and event.type == "content_block_delta":
+                first_token_at = now
+            if now - last_heartbeat >= 1.0:
+                activity.heartbeat({"events": events})
+                last_heartbeat = now
+        message = await stream.get_final_message()
+    finished = time.monotonic()
+    if first_token_at is None:
+        first_token_at = finished
+    generation_seconds = finished - first_token_at
+    timing = {
+        "streamed": True,
+        "duration_ms": (finished - started) * 1000,
+        "time_to_first_token_ms": (first_token_at - started) * 1000,
+        "tokens_per_second": message.usage.output_tokens / generation_seconds if generation_seconds > 0 else None,
+    }
+    return message, timing
 
 @activity.defn
-async def send_message_to_agent_tool(params: AgentMessageParans)-> str:
-#Get client and send signal.
-    from temporalio.client import Client
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    temporal_address = os.environ.get("TEMPORAL ADDRESS")
-    print("Received AgentMessageParams: (params)")
-    client = await Client.connect(temporal_address)
-    workflow_id= (
-        params.agents[params.to_id]["type"].lower() 
-        + "_" +
-        params.to_id 
-        + "_" +
-        params.run_id
+async def summarize_conversation(params: SummarizeParams) -> str:
+    from conversation import render_transcript
+    from llm_client import get_llm_client, get_llm_settings
+    client = get_llm_client()
+    prompt = (
+        "Summarize the conversation below so an agent can continue it without the full transcript. "
+        "Keep every open task, agent id, product, price, quote and commitment.\n\n"
     )
-    print("workflow_id", workflow_id)
+    if params.previous_summary:
+        prompt += f"Summary so far:\n{params.previous_summary}\n\n"
+    prompt += f"Conversation:\n{render_transcript(params.messages)}"
+    if params.language:
+        prompt += f"\n\nWrite the summary in {params.language}."
+
+    message = await client.messages.create(
+        model=get_llm_settings().summary_model,
+        max_tokens=1500,
+        temperature=0.0,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return "".join(block.text for block in message.content if block.type == "text")
+
+async def _deliver_agent_message(client, to_id: str, run_id: str, from_id: str, message: str, hint: str = "") -> None:
+    """Signal the recipient's workflow, starting it if needed. Raises UnknownAgentError or RPCError."""
+    from agent_directory import agent_directory
+    from instrumentation import span
+    entry = agent_directory.lookup(client, to_id, run_id, hint)
+    address = entry.address
+    payload = {
+        "from": from_id,
+        "message": message,
+        # Lets the recipient measure delivery and queue wait; see instrumentation.
+        "sent_at": time.time(),
+    }
+    activity_log.debug("Signaling workflow {workflow_id}", workflow_id=address.workflow_id, message=message)
+    if entry.running:
+        try:
+            with span("agent_signal", user_id=from_id, run_id=run_id, to_id=to_id, to_agent_type=address.agent_type):
+                await entry.handle.signal("agent_msg_signal", payload)
+            return
+        except RPCError as e:
+            # Typically NOT_FOUND: the run finished since. Start it again below.
+            agent_directory.invalidate(to_id, run_id)
+            invalidate_temporal_client(e)
+            entry = agent_directory.lookup(client, to_id, run_id, hint)
+    routing = get_task_queue_routing()
     try:
-        print("Try checking Workflow handle**\n")
-        agent_workflow_handle = client.get_workflow_handle (workflow_id)
-        workflow_info = await agent_workflow_handle.describe()
-        if (
-            workflow_info.status == WorkflowExecutionStatus.TERMINATED 
-            or workflow_info.status == WorkflowExecutionStatus.FAILED):
-        
-            print("Workflow terminated/failedes")
-            asyncio.create_task(
-                client.start_workflow(
-                    "BaseAgentWorkflow",
-                    InvocationParams(user_id=params.to_id, run_id=params.run_id, agent_type=params.agent_type), 
-                    id = workflow_id,
-                    task_queue=params.to_id + "-queue",
-                    #id_reuse_policy-4,
-                )
-            )
-        await wait_for_workflow_to_be_Ready(agent_workflow_handle)
-        print("WORKFLOW STARTED")
-        #await asyncio.sleep(5)
-
-    except Exception as e:
-        print("Error getting workflow handles: (e)")
-        asyncio.create_task(
-            client.start_workflow(
+        # Signal-with-start: one RPC signals the running agent, or starts it with this message queued.
+        with span("agent_signal_with_start", user_id=from_id, run_id=run_id, to_id=to_id, to_agent_type=address.agent_type):
+            await client.start_workflow(
                 "BaseAgentWorkflow",
-                InvocationParams(user_id=params.to_id, run_id=params.run_id, agent_type=params.agent_type), 
-                id = workflow_id,
-                task_queue=params.to_id + "-queue",
-                #id_reuse_policy-4,
+                InvocationParams(user_id=to_id, run_id=run_id, agent_type=address.agent_type),
+                id=address.workflow_id,
+                task_queue=address.task_queue,
+                priority=routing.priority_for(to_id),
+                start_signal="agent_msg_signal",
+                start_signal_args=[payload],
+                # Agents whose last run terminated or failed are restarted under the same id.
+                id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE_FAILED_ONLY,
             )
-        )
-        await wait_for_workflow_to_be_Ready(agent_workflow_handle)
-        print("WORKFLOW STARTED")
-        #await asyncio.sleep(5) 
-    
-    print(f"** Signaling workflow {workflow_id} with message: {params.message}**")
-    await agent_workflow_handle.signal(
-        "agent usg signal",
-        {
-            "from": params.user_id,
-            "message": params.message,
-        }
-    )
+    except RPCError as e:
+        agent_directory.invalidate(to_id, run_id)
+        invalidate_temporal_client(e)
+        raise
+    entry.running = True
+
+@activity.defn
+async def send_message_to_agent_tool(params: AgentMessageParams)-> str:
+    from agent_directory import UnknownAgentError
+    client = await get_temporal_client()
+    # params.agents is only set by workflows started before the agent directory; the model's agent_type is a fallback.
+    hint = params.agents.get(params.to_id, {}).get("type") or params.agent_type
+    try:
+        await _deliver_agent_message(client, params.to_id, params.run_id, params.user_id, params.message, hint)
+    except UnknownAgentError:
+        return f"Unknown agent id: {params.to_id}. Message not sent.\n"
     return f"Message sent to agent id: {params.to_id}. You will be invoked/notified if/when theynrespond. \n"
 
-async def wait_for_workflow_to_be_Ready(agent_workflow_handle):
-    while True:
-        try:
-            workflow_info = await agent_workflow_handle.describe()
-            while workflow_info.status != WorkflowExecutionStatus.RUNNING:
-                print(f"**Waiting for workflow to STABILIZE** - Current status {workflow_info.status}")
-                await asyncio.sleep(1)
-            break
-        except Exception as e:
-            print("**Waiting for workflow to Start**")
-            await asyncio.sleep(1)
+@activity.defn
+async def multicast_agent_message(params: MulticastParams) -> str:
+    """Deliver one message to many agents, at most params.max_parallel signals at a time.
+
+    Returns a JSON list with one {"to_id", "status", ...} per recipient; a failed recipient does
+    not fail the others or the activity.
+    """
+    from agent_directory import agent_directory, deliver_each
+    client = await get_temporal_client()
+    recipients = agent_directory.multicast_recipients(params.to_ids, params.agent_type, params.user_id, params.sender_type)
+
+    async def deliver(to_id: str) -> None:
+        await _deliver_agent_message(client, to_id, params.run_id, params.user_id, params.message)
+
+    statuses = await deliver_each(recipients, deliver, params.max_parallel)
+    activity_log.debug("Multicast delivered", sent=sum(status["status"] == "sent" for status in statuses), recipients=len(statuses))
+    if not statuses:
+        return "No agents matched. Message not sent.\n"
+    return json.dumps(statuses)
 
 
+@activity.defn
+async def load_agent_config(params: AgentConfigRequest) -> AgentConfigSnapshot:
+    from agent_config import AgentConfigError, agent_config_registry
+    try:
+        if params.workflow_id:
+            snapshot = agent_config_registry.resolve(params.workflow_id)
+            if snapshot is not None:
+                return snapshot
+        return agent_config_registry.get(params.agent_type, params.user_id)
+    except (FileNotFoundError, AgentConfigError) as e:
+        raise ApplicationError(f"No usable config for {params.agent_type}_{params.user_id}: {e}", non_retryable=True)
+
+# BaseAgentWorkflow now keeps reminders as workflow timers. This activity stays registered
+# so reminders scheduled by older workflow runs can still complete.
 @activity.defn
 async def schedule_tool(params: ScheduleParams) -> str:
-    print(f"Scheduling reminder for {params.time} seconds") 
-    await asyncio.sleep(params.time)
+    activity_log.debug("Scheduling reminder for {seconds} seconds", seconds=params.time)
+    # Legacy: reminders are workflow timers now and nothing starts this activity. It stays
+    # registered only for reminders that runs already in flight started, some of them with a
+    # heartbeat timeout, so it still heartbeats while it waits.
+    deadline = time.monotonic() + params.time
+    while (remaining := deadline - time.monotonic()) > 0:
+        activity.heartbeat()
+        await asyncio.sleep(min(remaining, 30))
     #Get client and send signal
-    from temporalio.client import Client
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    temporal_address = os.environ.get("TEMPORAL_ADDRESS")
-    client = await client.connect(temporal_address) 
+    client = await get_temporal_client()
     handle = client.get_workflow_handle(
         params.persona_type.lower() + "_" +
         params.user_id + "_" +
@@ -181,7 +297,7 @@ async def schedule_tool(params: ScheduleParams) -> str:
     )
 
     await handle.signal(
-        "scheduled_message_signal"
+        "scheduled_message_signal",
         f"message scheduled {params.time} seconds ago: {params.message}",
     )
     return "Reminder task done"
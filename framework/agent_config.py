@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+
+from workflow_types import AgentConfigSnapshot
+from agent_logging import get_logger
+from message_store import canonical_json, content_hash
+from tool_registry import ToolSchemaError, normalize_tool_schema
+
+AGENT_CONFIG_DIR = "agent_configs"
+log = get_logger("agent_config")
+
+
+class AgentConfigError(ValueError):
+    pass
+
+
+def agent_config_path(agent_type: str, user_id: str, config_dir: str = AGENT_CONFIG_DIR) -> str:
+    return os.path.join(config_dir, f"{agent_type}_{user_id}.json")
+
+
+def parse_agent_config(agent_type: str, user_id: str, config: dict) -> AgentConfigSnapshot:
+    if not isinstance(config.get("system_msg"), str):
+        raise AgentConfigError(f"{agent_type}_{user_id}: system_msg must be a string")
+    if not isinstance(config.get("agents", {}), dict):
+        raise AgentConfigError(f"{agent_type}_{user_id}: agents must be an object")
+    for key in ("tools", "additional_tools"):
+        if not isinstance(config.get(key, []), list):
+            raise AgentConfigError(f"{agent_type}_{user_id}: {key} must be a list")
+        for tool in config.get(key, []):
+            try:
+                normalize_tool_schema(tool)
+            except (ToolSchemaError, ValueError, AttributeError) as e:
+                raise AgentConfigError(f"{agent_type}_{user_id}: invalid tool in {key}: {e}") from e
+    known = {"system_msg", "language", "Language", "agents", "tools", "additional_tools", "user_id"}
+    return AgentConfigSnapshot(
+        agent_type=agent_type,
+        user_id=user_id,
+        version=content_hash(canonical_json(config)),
+        system_msg=config["system_msg"],
+        # Older configs were written with "Language".
+        language=config.get("language", config.get("Language", "English")),
+        agents=config.get("agents", {}),
+        tools=config.get("tools", []),
+        additional_tools=config.get("additional_tools", []),
+        settings={key: value for key, value in config.items() if key not in known},
+    )
+
+
+class AgentConfigRegistry:
+    """Worker-level cache of validated agent configs keyed by (agent_type, user_id).
+
+    A config is re-read only when its file's mtime changes.
+    """
+
+    def __init__(self, config_dir: str = AGENT_CONFIG_DIR):
+        self.config_dir = config_dir
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[float, AgentConfigSnapshot]] = {}
+        # "<agent_type lowercased>_<user_id>_" -> key, the prefix of that agent's workflow IDs.
+        self._workflow_id_prefixes: dict[str, tuple[str, str]] = {}
+
+    def load_all(self) -> int:
+        """Load every valid config in config_dir. Returns how many were loaded.
+
+        Unreadable or invalid files are logged and skipped, so one bad config (e.g. half written)
+        does not stop a worker that serves many agents.
+        """
+        if not os.path.isdir(self.config_dir):
+            return 0
+        loaded = 0
+        for file_name in sorted(os.listdir(self.config_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.config_dir, file_name), "r") as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                log.error("Skipping unreadable agent config {file}: {error}", file=file_name, error=str(e))
+                continue
+            user_id = config.get("user_id", "")
+            agent_type = file_name[:-len(".json")]
+            if user_id and agent_type.endswith("_" + user_id):
+                agent_type = agent_type[:-len(user_id) - 1]
+            else:
+                agent_type, _, user_id = agent_type.partition("_")
+            try:
+                self.get(agent_type, user_id)
+            except (OSError, ValueError) as e:
+                log.error("Skipping invalid agent config {file}: {error}", file=file_name, error=str(e))
+                continue
+            loaded += 1
+        return loaded
+
+    def get(self, agent_type: str, user_id: str) -> AgentConfigSnapshot:
+        key = (agent_type, user_id)
+        path = agent_config_path(agent_type, user_id, self.config_dir)
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+        with open(path, "r") as f:
+            snapshot = parse_agent_config(agent_type, user_id, json.load(f))
+        with self._lock:
+            self._entries[key] = (mtime, snapshot)
+            self._workflow_id_prefixes[f"{agent_type.lower()}_{user_id}_"] = key
+        return snapshot
+
+    def snapshots(self) -> list[AgentConfigSnapshot]:
+        """Every config loaded so far, as last read."""
+        with self._lock:
+            return [snapshot for _, snapshot in self._entries.values()]
+
+    def resolve(self, workflow_id: str) -> AgentConfigSnapshot | None:
+        """Config of the agent a workflow ID belongs to, among the loaded configs.
+
+        Used by workers on shared task queues, which serve many agents. The longest matching
+        prefix wins, so ids containing underscores resolve to the most specific agent.
+        """
+        with self._lock:
+            key = None
+            for index in reversed(range(len(workflow_id))):
+                if workflow_id[index] == "_" and workflow_id[:index + 1] in self._workflow_id_prefixes:
+                    key = self._workflow_id_prefixes[workflow_id[:index + 1]]
+                    break
+        if key is None:
+            return None
+        return self.get(*key)
+
+    def invalidate(self, agent_type: str | None = None, user_id: str | None = None) -> None:
+        with self._lock:
+            if agent_type is None:
+                self._entries.clear()
+                self._workflow_id_prefixes.clear()
+            else:
+                self._entries.pop((agent_type, user_id), None)
+                self._workflow_id_prefixes.pop(f"{agent_type.lower()}_{user_id}_", None)
+
+
+agent_config_registry = AgentConfigRegistry()
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from temporalio.client import Client, WorkflowHandle
+from temporalio.service import RPCError
+
+from agent_config import AgentConfigError, agent_config_registry
+from task_routing import get_task_queue_routing
+
+DEFAULT_TTL_SECONDS = 300.0
+
+
+class UnknownAgentError(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class AgentAddress:
+    agent_id: str
+    agent_type: str
+    workflow_id: str
+    task_queue: str
+
+
+@dataclass
+class _Entry:
+    address: AgentAddress
+    client: Client
+    handle: WorkflowHandle
+    expires_at: float
+    # Set after a successful delivery: the workflow was running then, so a plain signal is enough.
+    running: bool = False
+
+
+class AgentDirectory:
+    """Worker-level lookup of where an agent's workflow runs, with cached handles.
+
+    An agent's type comes from the agent configs loaded on this worker: its own config, or the
+    "agents" section of a colleague's. Messages then only need the recipient's ID. Entries expire
+    after ttl_seconds and are dropped on delivery failures.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._types: dict[str, str] = {}
+        self._types_loaded_at = 0.0
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _load_types(self) -> None:
+        types = {}
+        for snapshot in agent_config_registry.snapshots():
+            for agent_id, info in snapshot.agents.items():
+                if isinstance(info, dict) and info.get("type"):
+                    types.setdefault(agent_id, info["type"])
+        # An agent's own config wins over how its colleagues describe it.
+        for snapshot in agent_config_registry.snapshots():
+            types[snapshot.user_id] = snapshot.agent_type
+        with self._lock:
+            self._types = types
+            self._types_loaded_at = time.monotonic()
+
+    def agent_type(self, agent_id: str, hint: str = "") -> str:
+        """The agent's type, or hint (e.g. the agent_type the model wrote) if no config names it."""
+        agent_type = self._types.get(agent_id)
+        if agent_type is None or time.monotonic() - self._types_loaded_at > self.ttl_seconds:
+            self._load_types()
+            agent_type = self._types.get(agent_id, hint)
+        if not agent_type:
+            raise UnknownAgentError(agent_id)
+        return agent_type
+
+    def agents_of_type(self, agent_type: str, sender_id: str, sender_type: str) -> list[str]:
+        """IDs of the sender's colleagues of agent_type, per the sender's own config.
+
+        Never the other agents this worker knows of: on shared task queues those can belong to
+        other tenants. No matches if the sender's config cannot be read here.
+        """
+        try:
+            snapshot = agent_config_registry.get(sender_type, sender_id)
+        except (OSError, ValueError, AgentConfigError):
+            return []
+        wanted = agent_type.lower()
+        return [
+            agent_id for agent_id, info in snapshot.agents.items()
+            if isinstance(info, dict) and str(info.get("type", "")).lower() == wanted
+        ]
+
+    def multicast_recipients(self, to_ids: list[str], agent_type: str, sender_id: str, sender_type: str) -> list[str]:
+        """to_ids, then the sender's colleagues of agent_type, each once and never the sender."""
+        recipients = list(dict.fromkeys(to_ids))
+        if agent_type:
+            recipients += [
+                agent_id for agent_id in self.agents_of_type(agent_type, sender_id, sender_type)
+                if agent_id not in recipients
+            ]
+        return [agent_id for agent_id in recipients if agent_id != sender_id]
+
+    def resolve(self, agent_id: str, run_id: str, hint: str = "") -> AgentAddress:
+        agent_type = self.agent_type(agent_id, hint)
+        return AgentAddress(
+            agent_id=agent_id,
+            agent_type=agent_type,
+            workflow_id=f"{agent_type.lower()}_{agent_id}_{run_id}",
+            task_queue=get_task_queue_routing().task_queue_for(agent_id),
+        )
+
+    def lookup(self, client: Client, agent_id: str, run_id: str, hint: str = "") -> _Entry:
+        """Cached address and handle of (agent_id, run_id), resolving them on a miss or expiry."""
+        key = (agent_id, run_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            # A reconnected client invalidates handles bound to the old one.
+            if entry is not None and entry.expires_at > now and entry.client is client:
+                self.stats["hits"] += 1
+                return entry
+        address = self.resolve(agent_id, run_id, hint)
+        entry = _Entry(address, client, client.get_workflow_handle(address.workflow_id), now + self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = entry
+            self.stats["misses"] += 1
+        return entry
+
+    def invalidate(self, agent_id: str | None = None, run_id: str | None = None) -> None:
+        """Forget one agent's entry, or everything (including agent types) when called without arguments."""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if agent_id is None:
+                self._entries.clear()
+                self._types = {}
+            else:
+                self._entries.pop((agent_id, run_id), None)
+
+
+async def deliver_each(recipients: list[str], deliver: Callable[[str], Awaitable[None]], max_parallel: int) -> list[dict]:
+    """Run deliver(to_id) for every recipient, at most max_parallel at a time.
+
+    Returns one {"to_id", "status", ...} per recipient, in order; a failed delivery does not
+    stop the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def deliver_one(to_id: str) -> dict:
+        async with semaphore:
+            try:
+                await deliver(to_id)
+            except UnknownAgentError:
+                return {"to_id": to_id, "status": "unknown_agent"}
+            except RPCError as e:
+                return {"to_id": to_id, "status": "failed", "error": e.message}
+            return {"to_id": to_id, "status": "sent"}
+
+    return list(await asyncio.gather(*(deliver_one(to_id) for to_id in recipients)))
+
+
+agent_directory = AgentDirectory()
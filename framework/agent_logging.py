@@ -0,0 +1,158 @@
+import itertools
+import json
+import logging
+import os
+import sys
+
+from temporalio import workflow
+
+# Framework loggers are children of this one, e.g. "agent.llm.response".
+ROOT_LOGGER = "agent"
+DEFAULT_MAX_FIELD_CHARS = 500
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "ts": record.created,
+            "level": record.levelname,
+            "category": record.name[len(ROOT_LOGGER) + 1:],
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }, default=str)
+
+
+class LogSettings:
+    """Per-category sampling and payload truncation shared by every AgentLogger."""
+
+    def __init__(self, sampling: dict[str, float] | None = None, max_field_chars: int = DEFAULT_MAX_FIELD_CHARS):
+        self.sampling = sampling or {}
+        self.max_field_chars = max_field_chars
+        self._counters = {}
+
+    def rate(self, category: str) -> float:
+        # The most specific configured category wins: "llm.response" before "llm".
+        while True:
+            if category in self.sampling:
+                return self.sampling[category]
+            if "." not in category:
+                return 1.0
+            category = category.rsplit(".", 1)[0]
+
+    def sample(self, category: str) -> bool:
+        """Keep every 1/rate-th record of a category. Deterministic, so safe to call in workflow code."""
+        rate = self.rate(category)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        counter = self._counters.setdefault(category, itertools.count(1))
+        count = next(counter)
+        return int(count * rate) > int((count - 1) * rate)
+
+    def truncate(self, value) -> str | int | float | bool | None:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        text = value if isinstance(value, str) else json.dumps(value, default=str) if isinstance(value, (dict, list)) else str(value)
+        if len(text) > self.max_field_chars:
+            return f"{text[:self.max_field_chars]}...(+{len(text) - self.max_field_chars} chars)"
+        return text
+
+
+def parse_sampling(spec: str) -> dict[str, float]:
+    """"llm.response=0.01,workflow.query=0" -> {"llm.response": 0.01, "workflow.query": 0.0}."""
+    sampling = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        category, _, rate = item.partition("=")
+        sampling[category.strip()] = float(rate)
+    return sampling
+
+
+_settings: LogSettings | None = None
+
+
+def configure_logging(
+    level: str | None = None,
+    fmt: str | None = None,
+    sampling: dict[str, float] | None = None,
+    max_field_chars: int | None = None,
+    stream=None,
+) -> LogSettings:
+    """Set up the "agent" loggers. Unset arguments come from AGENT_LOG_LEVEL, AGENT_LOG_FORMAT
+    (text or json), AGENT_LOG_SAMPLING and AGENT_LOG_MAX_FIELD_CHARS."""
+    global _settings
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel((level or os.environ.get("AGENT_LOG_LEVEL", "INFO")).upper())
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if (fmt or os.environ.get("AGENT_LOG_FORMAT", "text")) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.propagate = False
+    _settings = LogSettings(
+        sampling if sampling is not None else parse_sampling(os.environ.get("AGENT_LOG_SAMPLING", "")),
+        max_field_chars if max_field_chars is not None else int(os.environ.get("AGENT_LOG_MAX_FIELD_CHARS", DEFAULT_MAX_FIELD_CHARS)),
+    )
+    return _settings
+
+
+def get_settings() -> LogSettings:
+    if _settings is None:
+        configure_logging()
+    return _settings
+
+
+class AgentLogger:
+    """Leveled, structured logger for workflow and activity code.
+
+    Messages are str.format templates over the keyword fields, e.g.
+    log.info("Turn {turn} done", turn=3, usage=usage). Nothing is formatted, serialized or
+    truncated unless the record is emitted; a field can also be a zero-argument callable that
+    is only called then. Records from workflow code are dropped while the workflow replays.
+    """
+
+    def __init__(self, category: str):
+        self.category = category
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{category}")
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, template: str, fields: dict) -> None:
+        settings = get_settings()
+        if not self._logger.isEnabledFor(level):
+            return
+        in_workflow = workflow.in_workflow()
+        if in_workflow and workflow.unsafe.is_replaying():
+            return
+        if not settings.sample(self.category):
+            return
+        resolved = {
+            key: settings.truncate(value() if callable(value) else value)
+            for key, value in fields.items()
+        }
+        message = template.format(**resolved) if resolved else template
+        if in_workflow:
+            with workflow.unsafe.sandbox_unrestricted():
+                self._logger.log(level, message, extra={"fields": resolved})
+        else:
+            self._logger.log(level, message, extra={"fields": resolved})
+
+    def debug(self, template: str, **fields) -> None:
+        self._log(logging.DEBUG, template, fields)
+
+    def info(self, template: str, **fields) -> None:
+        self._log(logging.INFO, template, fields)
+
+    def warning(self, template: str, **fields) -> None:
+        self._log(logging.WARNING, template, fields)
+
+    def error(self, template: str, **fields) -> None:
+        self._log(logging.ERROR, template, fields)
+
+
+def get_logger(category: str) -> AgentLogger:
+    return AgentLogger(category)
@@ -2,16 +2,16 @@ def calculator():
     return '''{
   "name": "calculator",
   "description": "A calculator tool for performing basic arithmetic operations.",
-  "parameters": {
+  "input_schema": {
     "type": "object",
     "properties": {
-      "params": {
+      "expression": {
         "type": "string",
-        "description": "CalculatorParams is an object containing input values required for performing calculations in a calculator application."
+        "description": "The arithmetic expression to evaluate, e.g. (2 + 3) * 4."
       }
     },
     "required": [
-      "params"
+      "expression"
     ]
   }
 }'''
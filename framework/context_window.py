@@ -0,0 +1,131 @@
+from abc import ABC, abstractmethod
+from dataclasses import replace
+from typing import Awaitable, Callable
+
+from workflow_types import ContextWindowPolicy, LLMState
+from agent_logging import get_logger
+from conversation import ensure_token_counts, set_messages, turn_start_indices, update_overhead_tokens
+
+log = get_logger("workflow.context_window")
+
+
+class ContextStrategy(ABC):
+    # If True the dropped turns are folded into the conversation summary and removed from history.
+    summarizes_dropped_turns = False
+
+    @abstractmethod
+    def select(self, turn_tokens: list[int], budget: int) -> list[int]:
+        """Return the indices of the turns to keep. The last turn is always kept."""
+
+
+class SlidingWindowStrategy(ContextStrategy):
+    def select(self, turn_tokens: list[int], budget: int) -> list[int]:
+        kept = []
+        used = 0
+        for index in reversed(range(len(turn_tokens))):
+            if kept and used + turn_tokens[index] > budget:
+                break
+            kept.append(index)
+            used += turn_tokens[index]
+        return sorted(kept)
+
+
+class KeepFirstAndLastStrategy(ContextStrategy):
+    """Keep the opening turns (usually the task) plus as many recent turns as fit."""
+
+    def __init__(self, keep_first_turns: int = 1):
+        self.keep_first_turns = keep_first_turns
+
+    def select(self, turn_tokens: list[int], budget: int) -> list[int]:
+        first = list(range(min(self.keep_first_turns, len(turn_tokens) - 1)))
+        used = sum(turn_tokens[index] for index in first)
+        recent = SlidingWindowStrategy().select(turn_tokens[len(first):], budget - used)
+        return first + [len(first) + index for index in recent]
+
+
+class SummarizeOlderTurnsStrategy(SlidingWindowStrategy):
+    summarizes_dropped_turns = True
+
+
+def build_strategy(policy: ContextWindowPolicy) -> ContextStrategy | None:
+    if policy.strategy == "none":
+        return None
+    if policy.strategy == "sliding_window":
+        return SlidingWindowStrategy()
+    if policy.strategy == "keep_first_and_last":
+        return KeepFirstAndLastStrategy(policy.keep_first_turns)
+    if policy.strategy == "summarize_older":
+        return SummarizeOlderTurnsStrategy()
+    raise ValueError(f"Unknown context window strategy: {policy.strategy}")
+
+
+class ContextWindowManager:
+    """Fits the conversation into a token budget before each llm_call.
+
+    Cuts are only made at turn boundaries, so a tool_use is never separated from its tool_result.
+    """
+
+    def __init__(self, policy: ContextWindowPolicy, strategy: ContextStrategy | None = None):
+        self.policy = policy
+        self.strategy = strategy if strategy is not None else build_strategy(policy)
+        # Turn indices left out of requests. History is append-only between summaries, so they stay valid.
+        self.excluded_turns = set()
+
+    async def prepare(self, state: LLMState, summarize: Callable[[list[dict], str], Awaitable[str]]) -> LLMState:
+        """Return the state to send to llm_call.
+
+        With a summarizing strategy the dropped turns are summarized and removed from state itself;
+        otherwise state is left untouched and a trimmed copy is returned.
+        """
+        if self.strategy is None:
+            return state
+        ensure_token_counts(state)
+        available = self.policy.max_tokens - state.overhead_tokens
+        if not self.excluded_turns and state.token_total <= available:
+            return state
+
+        # Turn boundaries as message index ranges, with token sums from the cached per-message counts.
+        starts = [0] + [index for index in turn_start_indices(state.messages) if index > 0]
+        bounds = list(zip(starts, starts[1:] + [len(state.messages)]))
+        turn_tokens = [sum(state.message_tokens[start:end]) for start, end in bounds]
+        included_tokens = sum(tokens for index, tokens in enumerate(turn_tokens) if index not in self.excluded_turns)
+        if included_tokens > available:
+            kept = set(self.strategy.select(turn_tokens, int(available * self.policy.trim_to_ratio)))
+            dropped = [index for index in range(len(bounds)) if index not in kept]
+            log.info(
+                "Context over budget ({tokens} > {max_tokens} tokens), dropping {dropped} turns",
+                tokens=included_tokens + state.overhead_tokens,
+                max_tokens=self.policy.max_tokens,
+                dropped=len(dropped),
+            )
+            if self.strategy.summarizes_dropped_turns:
+                if dropped:
+                    state.summary = await summarize(
+                        [message for index in dropped for message in state.messages[slice(*bounds[index])]],
+                        state.summary,
+                    )
+                    kept_indices = [i for index in sorted(kept) for i in range(*bounds[index])]
+                    set_messages(
+                        state,
+                        [state.messages[i] for i in kept_indices],
+                        [state.message_tokens[i] for i in kept_indices],
+                    )
+                    update_overhead_tokens(state)
+                self.excluded_turns = set()
+                return state
+            self.excluded_turns = set(dropped)
+        if not self.excluded_turns:
+            return state
+        kept_indices = [
+            i
+            for index, bound in enumerate(bounds)
+            if index not in self.excluded_turns
+            for i in range(*bound)
+        ]
+        message_tokens = [state.message_tokens[i] for i in kept_indices]
+        return replace(
+            state,
+            messages=[state.messages[i] for i in kept_indices],
+            message_tokens=message_tokens,
+            token_total=sum(message_tokens),
+        )
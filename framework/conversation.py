@@ -0,0 +1,198 @@
+import json
+from dataclasses import replace
+
+
+def estimate_tokens(obj) -> int:
+    """Rough local token count (about four characters per token)."""
+    if not obj:
+        return 0
+    text = obj if isinstance(obj, str) else json.dumps(obj)
+    return len(text) // 4 + 1
+
+
+def is_tool_result_message(message: dict) -> bool:
+    """Return True if the message carries tool_result blocks for a previous tool_use."""
+    content = message.get("content")
+    if message.get("role") != "user" or not isinstance(content, list):
+        return False
+    return any(
+        isinstance(block, dict) and block.get("type") == "tool_result"
+        for block in content
+    )
+
+
+def turn_start_indices(messages: list[dict]) -> list[int]:
+    """Indices of the messages that open a new turn.
+
+    A turn starts with a user message that is not a tool_result, so cutting the
+    history at one of these indices never separates a tool_use from its tool_result.
+    """
+    return [
+        index
+        for index, message in enumerate(messages)
+        if message.get("role") == "user" and not is_tool_result_message(message)
+    ]
+
+
+def split_for_compaction(messages: list[dict], keep_last_turns: int) -> tuple[list[dict], list[dict]]:
+    """Split messages into (older, recent) where recent holds the last N complete turns."""
+    starts = turn_start_indices(messages)
+    if keep_last_turns <= 0:
+        return list(messages), []
+    if len(starts) <= keep_last_turns:
+        return [], list(messages)
+    cut = starts[-keep_last_turns]
+    return list(messages[:cut]), list(messages[cut:])
+
+
+def render_transcript(messages: list[dict]) -> str:
+    """Flatten messages into plain text, e.g. as input for a summarization prompt."""
+    lines = []
+    for message in messages:
+        role = message.get("role", "user")
+        content = message.get("content")
+        if isinstance(content, str):
+            lines.append(f"{role}: {content}")
+            continue
+        for block in content or []:
+            block_type = block.get("type")
+            if block_type == "text":
+                lines.append(f"{role}: {block.get('text', '')}")
+            elif block_type == "tool_use":
+                lines.append(f"{role} called {block.get('name')}: {json.dumps(block.get('input', {}))}")
+            elif block_type == "tool_result":
+                lines.append(f"tool result: {block.get('content', '')}")
+    return "\n".join(lines)
+
+
+def message_page(messages: list[dict], offset: int, cursor: int, limit: int) -> dict:
+    """A page of get_messages: messages[i] is at position offset + i of the whole conversation.
+
+    next_cursor never goes back past cursor, so a client polling ahead of the conversation waits
+    at its cursor for new messages.
+    """
+    start = max(cursor, offset)
+    end = offset + len(messages)
+    stop = max(start, min(end, start + max(limit, 0)))
+    return {
+        "messages": messages[start - offset:stop - offset],
+        "cursor": start,
+        "next_cursor": stop,
+        "has_more": stop < end,
+        "truncated": cursor < offset,
+    }
+
+
+def take_input_batch(queue: list, batching) -> list:
+    """Remove and return the queued inputs for the next turn, in arrival order.
+
+    Up to batching.max_batch of them with a MessageBatchingPolicy that is enabled, otherwise one.
+    """
+    batch_size = max(1, batching.max_batch) if batching.enabled else 1
+    batch = queue[:batch_size]
+    del queue[:batch_size]
+    return batch
+
+
+def split_turns(messages: list[dict]) -> list[list[dict]]:
+    """Group messages into turns; see turn_start_indices. Leading messages join the first turn."""
+    starts = [index for index in turn_start_indices(messages) if index > 0]
+    turns = []
+    previous = 0
+    for start in starts:
+        turns.append(messages[previous:start])
+        previous = start
+    if previous < len(messages):
+        turns.append(messages[previous:])
+    return turns
+
+
+# Per-message token accounting on LLMState. Every message carries a cached count in
+# message_tokens (same index as messages) and token_total is kept up to date, so the
+# context size is known without re-tokenizing the conversation.
+
+def ensure_token_counts(state) -> None:
+    """Count messages that were added without append_message, e.g. state from an older run."""
+    if len(state.message_tokens) != len(state.messages):
+        state.message_tokens = [estimate_tokens(message) for message in state.messages]
+        state.token_total = sum(state.message_tokens)
+        state.confirmed_messages = 0
+
+
+def append_message(state, message: dict, tokens: int | None = None) -> None:
+    ensure_token_counts(state)
+    count = tokens if tokens is not None else estimate_tokens(message)
+    state.messages.append(message)
+    state.message_tokens.append(count)
+    state.token_total += count
+
+
+def set_messages(state, messages: list[dict], message_tokens: list[int]) -> None:
+    """Replace the conversation, e.g. after compaction, keeping the counts already computed."""
+    state.messages = messages
+    state.message_tokens = message_tokens
+    state.token_total = sum(message_tokens)
+    state.confirmed_messages = 0
+
+
+def update_overhead_tokens(state) -> None:
+    """Re-estimate the tokens of the system prompt, summary and tool schemas."""
+    state.overhead_tokens = (
+        estimate_tokens(state.system_message)
+        + estimate_tokens(state.summary)
+        + estimate_tokens(state.tools)
+    )
+
+
+def calibrate_token_counts(state, prompt_tokens: int) -> None:
+    """Correct the cached counts with the prompt size the API reported for all of state.messages.
+
+    The first time, every count (overhead included) is scaled by the same ratio. After that the
+    confirmed prefix is known, so the rest of the reported size is spread over the new messages.
+    """
+    ensure_token_counts(state)
+    unconfirmed = range(state.confirmed_messages, len(state.messages))
+    if state.confirmed_messages == 0:
+        estimated = state.overhead_tokens + state.token_total
+        if estimated <= 0:
+            return
+        ratio = prompt_tokens / estimated
+        state.overhead_tokens = round(state.overhead_tokens * ratio)
+        residual = prompt_tokens - state.overhead_tokens
+    else:
+        confirmed_tokens = sum(state.message_tokens[:state.confirmed_messages])
+        residual = prompt_tokens - state.overhead_tokens - confirmed_tokens
+    estimated_new = sum(state.message_tokens[index] for index in unconfirmed)
+    if residual > 0 and estimated_new > 0:
+        ratio = residual / estimated_new
+        for index in unconfirmed:
+            state.message_tokens[index] = max(1, round(state.message_tokens[index] * ratio))
+        state.token_total = sum(state.message_tokens)
+    state.confirmed_messages = len(state.messages)
+
+
+def carry_over_state(state, older_count: int, summary: str):
+    """The LLMState handed to the next run on continue-as-new.
+
+    Only the summary and the messages after the first older_count, with their counts. The new run
+    re-applies its config for the system prompt, tools and agents, and message-store refs are per run.
+    """
+    return replace(
+        state,
+        messages=state.messages[older_count:],
+        message_tokens=state.message_tokens[older_count:],
+        summary=summary,
+        system_message="",
+        tools=[],
+        agents={},
+        system_ref="",
+        tools_ref="",
+        message_refs=[],
+        blobs={},
+    )
+
+
+def restore_carried_state(state, carried) -> None:
+    """Start state from the LLMState a previous run carried over; see carry_over_state."""
+    state.summary = carried.summary
+    set_messages(state, carried.messages, carried.message_tokens)
@@ -0,0 +1,276 @@
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from temporalio import activity, workflow
+from temporalio.runtime import BUFFERED_METRIC_KIND_HISTOGRAM, MetricBuffer, Runtime, TelemetryConfig
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    ExecuteWorkflowInput,
+    HandleSignalInput,
+    Interceptor,
+    StartActivityInput,
+    StartLocalActivityInput,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+    WorkflowOutboundInterceptor,
+)
+
+# Attributes every span and histogram is tagged with, when known.
+AGENT_TAGS = ("agent_type", "user_id", "run_id")
+
+# SDK metrics forwarded from the Temporal runtime, e.g. temporal_workflow_task_execution_latency.
+SDK_HISTOGRAMS = (
+    "temporal_workflow_task_schedule_to_start_latency",
+    "temporal_workflow_task_execution_latency",
+    "temporal_workflow_task_replay_latency",
+    "temporal_activity_schedule_to_start_latency",
+    "temporal_activity_execution_latency",
+)
+
+
+@dataclass
+class Span:
+    name: str
+    start_time: float
+    duration_ms: float
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+
+class TelemetryExporter(ABC):
+    """Where spans and histogram samples go. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def export_span(self, span: Span) -> None:
+        ...
+
+    @abstractmethod
+    def record_histogram(self, name: str, value: float, attributes: dict) -> None:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+
+class NoopExporter(TelemetryExporter):
+    def export_span(self, span: Span) -> None:
+        pass
+
+    def record_histogram(self, name: str, value: float, attributes: dict) -> None:
+        pass
+
+
+class JsonLinesExporter(TelemetryExporter):
+    """One JSON object per span or sample, to a file or stdout."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    @classmethod
+    def to_file(cls, path: str) -> "JsonLinesExporter":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return cls(open(path, "a", buffering=1))
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+
+    def export_span(self, span: Span) -> None:
+        self._write({"type": "span", **asdict(span)})
+
+    def record_histogram(self, name: str, value: float, attributes: dict) -> None:
+        self._write({"type": "histogram", "name": name, "value": value, "time": time.time(), "attributes": attributes})
+
+    def flush(self) -> None:
+        with self._lock:
+            self.stream.flush()
+
+
+def open_exporter(url: str) -> TelemetryExporter:
+    """"stdout", "file:///path/to/telemetry.jsonl" or "none"."""
+    if url in ("", "none"):
+        return NoopExporter()
+    if url == "stdout":
+        return JsonLinesExporter(sys.stdout)
+    if url.startswith("file://"):
+        return JsonLinesExporter.to_file(url[len("file://"):])
+    raise ValueError(f"Unsupported telemetry exporter: {url}")
+
+
+_exporter: TelemetryExporter | None = None
+
+
+def get_exporter() -> TelemetryExporter:
+    """Process-wide exporter, configured with AGENT_TELEMETRY (default: none)."""
+    global _exporter
+    if _exporter is None:
+        _exporter = open_exporter(os.environ.get("AGENT_TELEMETRY", "none"))
+    return _exporter
+
+
+def set_exporter(exporter: TelemetryExporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def telemetry_enabled() -> bool:
+    return not isinstance(get_exporter(), NoopExporter)
+
+
+def agent_tags(obj) -> dict:
+    """agent_type/user_id/run_id from InvocationParams, LLMState, AgentMessageParams and similar inputs."""
+    tags = {}
+    for key, attribute in (("agent_type", "agent_type"), ("agent_type", "persona_type"), ("user_id", "user_id"), ("run_id", "run_id")):
+        value = getattr(obj, attribute, None)
+        if value and key not in tags:
+            tags[key] = value
+    return tags
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block of activity or worker code. Not for workflow code; see workflow_histogram."""
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        exporter = get_exporter()
+        duration_ms = (time.perf_counter() - started) * 1000
+        exporter.export_span(Span(name, started_at, duration_ms, attributes, error))
+        exporter.record_histogram(f"{name}_ms", duration_ms, attributes)
+
+
+def record_histogram(name: str, value: float, **attributes) -> None:
+    get_exporter().record_histogram(name, value, attributes)
+
+
+def workflow_histogram(name: str, value: float, attributes: dict) -> None:
+    """Record a sample from workflow code. Skipped while replaying so every sample is recorded once."""
+    if workflow.unsafe.is_replaying():
+        return
+    with workflow.unsafe.sandbox_unrestricted():
+        get_exporter().record_histogram(name, value, attributes)
+
+
+class AgentTelemetryInterceptor(Interceptor):
+    """Worker interceptor that times activities and workflow-side activity calls and signals.
+
+    Activities: schedule-to-start (queue wait) and execution time. Workflows: activity round trip
+    as the workflow sees it, and how long inter-agent signals took to arrive (messages carry sent_at).
+    """
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _ActivityInbound(next)
+
+    def workflow_interceptor_class(self, input: WorkflowInterceptorClassInput) -> type[WorkflowInboundInterceptor]:
+        return _WorkflowInbound
+
+
+class _ActivityInbound(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput):
+        info = activity.info()
+        attributes = {
+            **(agent_tags(input.args[0]) if input.args else {}),
+            "activity": info.activity_type,
+            "workflow_id": info.workflow_id,
+            "attempt": info.attempt,
+        }
+        if info.current_attempt_scheduled_time is not None and info.started_time is not None:
+            queue_wait = info.started_time - info.current_attempt_scheduled_time
+            record_histogram("agent_activity_queue_wait_ms", queue_wait.total_seconds() * 1000, **attributes)
+        with span("agent_activity", **attributes):
+            return await super().execute_activity(input)
+
+
+class _WorkflowInbound(WorkflowInboundInterceptor):
+    def init(self, outbound: WorkflowOutboundInterceptor) -> None:
+        self.tags = {}
+        super().init(_WorkflowOutbound(outbound, self))
+
+    async def execute_workflow(self, input: ExecuteWorkflowInput):
+        if input.args:
+            self.tags = agent_tags(input.args[0])
+        return await super().execute_workflow(input)
+
+    async def handle_signal(self, input: HandleSignalInput) -> None:
+        message = input.args[0] if input.args else None
+        if isinstance(message, dict) and isinstance(message.get("sent_at"), (int, float)):
+            workflow_histogram(
+                "agent_signal_delivery_ms",
+                (workflow.now().timestamp() - message["sent_at"]) * 1000,
+                {**self.tags, "signal": input.signal, "from": message.get("from", "")},
+            )
+        return await super().handle_signal(input)
+
+
+class _WorkflowOutbound(WorkflowOutboundInterceptor):
+    def __init__(self, next: WorkflowOutboundInterceptor, inbound: _WorkflowInbound):
+        super().__init__(next)
+        self.inbound = inbound
+
+    def _timed(self, handle, activity_name: str, local: bool):
+        scheduled_at = workflow.now()
+
+        def done(_):
+            workflow_histogram(
+                "agent_workflow_activity_round_trip_ms",
+                (workflow.now() - scheduled_at) / timedelta(milliseconds=1),
+                {**self.inbound.tags, "activity": activity_name, "local": local},
+            )
+
+        handle.add_done_callback(done)
+        return handle
+
+    def start_activity(self, input: StartActivityInput):
+        return self._timed(super().start_activity(input), input.activity, False)
+
+    def start_local_activity(self, input: StartLocalActivityInput):
+        return self._timed(super().start_local_activity(input), input.activity, True)
+
+
+class SdkMetricsForwarder:
+    """Copies the Temporal SDK's own histograms (workflow task latency etc.) to the exporter.
+
+    install() must run before the first client connects, since it replaces the default runtime.
+    """
+
+    def __init__(self, buffer_size: int = 10000, interval_seconds: float = 5.0):
+        self.buffer = MetricBuffer(buffer_size)
+        self.interval_seconds = interval_seconds
+
+    def install(self) -> None:
+        Runtime.set_default(Runtime(telemetry=TelemetryConfig(metrics=self.buffer)), error_if_already_set=False)
+
+    def drain(self) -> int:
+        exporter = get_exporter()
+        forwarded = 0
+        for update in self.buffer.retrieve_updates():
+            metric = update.metric
+            if metric.kind == BUFFERED_METRIC_KIND_HISTOGRAM and metric.name in SDK_HISTOGRAMS:
+                exporter.record_histogram(f"{metric.name}_ms", update.value, dict(update.attributes))
+                forwarded += 1
+        return forwarded
+
+    async def run(self) -> None:
+        import asyncio
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            self.drain()
+            get_exporter().flush()
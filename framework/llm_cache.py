@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from message_store import canonical_json, content_hash
+from prompt_cache import cache_usage
+
+
+def response_cache_key(model: str, system: str, tools: list[dict], messages: list[dict], max_tokens: int) -> str:
+    """Stable hash of everything that determines a temperature-0 response."""
+    return content_hash(canonical_json({
+        "model": model,
+        "system": system,
+        "tools": tools,
+        "messages": messages,
+        "max_tokens": max_tokens,
+    }))
+
+
+def cache_hit_response(cached: dict) -> dict:
+    """What llm_call returns for a cached response.
+
+    Nothing was billed, so usage is zero; the original usage is kept as cached_usage because it
+    still gives the prompt's size.
+    """
+    return {**cached, "usage": cache_usage(None), "cached_usage": cached.get("usage"), "timing": {"cached": True}}
+
+
+class LLMResponseCache:
+    """On-disk LRU of llm_call responses with TTL and entry/size-based eviction."""
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            body, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(body)
+
+    def put(self, key: str, response: dict) -> None:
+        body = json.dumps(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        # Walk from the least recently used entry until both limits hold again.
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.stats["evictions"] += len(doomed)
+
+
+_response_cache = None
+
+
+def get_response_cache() -> LLMResponseCache | None:
+    """The worker's response cache, or None when LLM_RESPONSE_CACHE is not configured."""
+    global _response_cache
+    if _response_cache is None:
+        from llm_client import get_llm_settings
+        settings = get_llm_settings()
+        if not settings.response_cache_path:
+            return None
+        _response_cache = LLMResponseCache(
+            settings.response_cache_path,
+            max_entries=settings.response_cache_max_entries,
+            max_bytes=settings.response_cache_max_bytes,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+        )
+    return _response_cache
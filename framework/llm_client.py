@@ -0,0 +1,113 @@
+import os
+from dataclasses import dataclass
+
+from anthropic import DEFAULT_CONNECTION_LIMITS, AsyncAnthropic, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class LLMSettings:
+    api_key: str | None = None
+    base_url: str | None = None
+    model: str = "claude-3-5-sonnet-20241022"
+    summary_model: str = "claude-3-5-haiku-20241022"
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    timeout: float = 600.0
+    max_retries: int = 2
+    response_cache_path: str | None = None
+    response_cache_max_entries: int = 10000
+    response_cache_max_bytes: int = 512 * 1024 * 1024
+    response_cache_ttl_seconds: float = 7 * 24 * 3600
+
+
+def load_llm_settings() -> LLMSettings:
+    """Read LLM settings from the environment (and .env). Called once per worker, and on refresh."""
+    load_dotenv(override=True)
+    defaults = LLMSettings()
+    return LLMSettings(
+        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        base_url=os.environ.get("ANTHROPIC_API_BASE_URL"),
+        model=os.environ.get("LLM_MODEL", defaults.model),
+        summary_model=os.environ.get("LLM_SUMMARY_MODEL", defaults.summary_model),
+        max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", defaults.max_connections)),
+        max_keepalive_connections=int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections)),
+        keepalive_expiry=float(os.environ.get("LLM_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)),
+        timeout=float(os.environ.get("LLM_TIMEOUT", defaults.timeout)),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", defaults.max_retries)),
+        response_cache_path=os.environ.get("LLM_RESPONSE_CACHE"),
+        response_cache_max_entries=int(os.environ.get("LLM_RESPONSE_CACHE_MAX_ENTRIES", defaults.response_cache_max_entries)),
+        response_cache_max_bytes=int(os.environ.get("LLM_RESPONSE_CACHE_MAX_BYTES", defaults.response_cache_max_bytes)),
+        response_cache_ttl_seconds=float(os.environ.get("LLM_RESPONSE_CACHE_TTL_SECONDS", defaults.response_cache_ttl_seconds)),
+    )
+
+
+class LLMClientRegistry:
+    """Worker-scoped LLM clients that keep their HTTP connection pool alive across activities."""
+
+    def __init__(self):
+        self._settings: LLMSettings | None = None
+        self._client: AsyncAnthropic | None = None
+        # Clients replaced by refresh() may still be serving in-flight calls; they are closed on the next refresh.
+        self._retired: list[AsyncAnthropic] = []
+
+    @property
+    def settings(self) -> LLMSettings:
+        if self._settings is None:
+            self._settings = load_llm_settings()
+        return self._settings
+
+    def get(self) -> AsyncAnthropic:
+        if self._client is None:
+            settings = self.settings
+            self._client = AsyncAnthropic(
+                api_key=settings.api_key,
+                base_url=settings.base_url,
+                timeout=settings.timeout,
+                max_retries=settings.max_retries,
+                http_client=DefaultAsyncHttpxClient(
+                    # The SDK's own Limits class, so we need not import its HTTP library by name.
+                    limits=type(DEFAULT_CONNECTION_LIMITS)(
+                        max_connections=settings.max_connections,
+                        max_keepalive_connections=settings.max_keepalive_connections,
+                        keepalive_expiry=settings.keepalive_expiry,
+                    ),
+                ),
+            )
+        return self._client
+
+    async def refresh(self) -> LLMSettings:
+        """Re-read settings, e.g. after an API key rotation. New calls use a fresh client."""
+        for client in self._retired:
+            await client.close()
+        self._retired = [self._client] if self._client is not None else []
+        self._client = None
+        self._settings = load_llm_settings()
+        return self._settings
+
+    async def close(self) -> None:
+        for client in [*self._retired, self._client]:
+            if client is not None:
+                await client.close()
+        self._retired = []
+        self._client = None
+
+
+_registry = LLMClientRegistry()
+
+
+def get_llm_client() -> AsyncAnthropic:
+    return _registry.get()
+
+
+def get_llm_settings() -> LLMSettings:
+    return _registry.settings
+
+
+async def refresh_llm_clients() -> LLMSettings:
+    return await _registry.refresh()
+
+
+async def close_llm_clients() -> None:
+    await _registry.close()
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+
+def canonical_json(obj) -> str:
+    """Serialize obj the same way every time so equal content gets an equal hash."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class MessageStore(ABC):
+    """Content-addressed storage for conversation blobs (messages, system prompt, tool schemas)."""
+
+    @abstractmethod
+    def put_many(self, blobs: dict[str, str]) -> None:
+        """Store blobs keyed by their content hash. Existing hashes are left untouched."""
+
+    @abstractmethod
+    def get_many(self, hashes: list[str]) -> dict[str, str]:
+        """Return the stored blobs for the given hashes. Unknown hashes are omitted."""
+
+
+class FileSystemMessageStore(MessageStore):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put_many(self, blobs: dict[str, str]) -> None:
+        for digest, body in blobs.items():
+            path = self._path(digest)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+    def get_many(self, hashes: list[str]) -> dict[str, str]:
+        found = {}
+        for digest in hashes:
+            try:
+                with open(self._path(digest), "r", encoding="utf-8") as f:
+                    found[digest] = f.read()
+            except FileNotFoundError:
+                pass
+        return found
+
+
+class SQLiteMessageStore(MessageStore):
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, body TEXT NOT NULL)")
+        self._conn.commit()
+
+    def put_many(self, blobs: dict[str, str]) -> None:
+        if not blobs:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, body) VALUES (?, ?)", blobs.items()
+            )
+            self._conn.commit()
+
+    def get_many(self, hashes: list[str]) -> dict[str, str]:
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, body FROM blobs WHERE hash IN ({placeholders})", chunk
+                )
+                found.update(rows)
+        return found
+
+
+def open_message_store(url: str) -> MessageStore:
+    """Open a store from a URL such as sqlite:///agent_store/messages.db or file:///agent_store/blobs."""
+    # As with SQLAlchemy URLs, sqlite:///rel/path is relative and sqlite:////abs/path is absolute.
+    if url.startswith("sqlite:///"):
+        return SQLiteMessageStore(url[len("sqlite:///"):])
+    if url.startswith("file://"):
+        return FileSystemMessageStore(url[len("file://"):])
+    return FileSystemMessageStore(url)
+
+
+_message_store = None
+
+
+def get_message_store() -> MessageStore:
+    """Process-wide store used by activities, configured with AGENT_MESSAGE_STORE."""
+    global _message_store
+    if _message_store is None:
+        _message_store = open_message_store(
+            os.environ.get("AGENT_MESSAGE_STORE", "sqlite:///agent_store/messages.db")
+        )
+    return _message_store
+
+
+def set_message_store(store: MessageStore) -> None:
+    """Replace the process-wide store, e.g. with a custom MessageStore implementation."""
+    global _message_store
+    _message_store = store
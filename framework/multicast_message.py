@@ -0,0 +1,38 @@
+def multicast_agents_message():
+    return '''{
+  "name": "multicast_agents_message",
+  "description": "Send the same message to several agents at once, e.g. a purchase intent to every bank. Name the recipients in to_ids, or set agent_type to reach all your agents of that type. Returns the delivery status for each recipient.",
+  "input_schema": {
+    "properties": {
+      "thinking": {
+        "description": "The 'thinking' parameter is a string that represents the thought process or reasoning behind a decision or action. It should be used to provide context or explanation for the function's output or behavior.",
+        "title": "Thinking",
+        "type": "string"
+      },
+      "message": {
+        "description": "The message every recipient receives.",
+        "title": "Message",
+        "type": "string"
+      },
+      "to_ids": {
+        "description": "User ids of the agents to message.",
+        "items": {
+          "type": "string"
+        },
+        "title": "To Ids",
+        "type": "array"
+      },
+      "agent_type": {
+        "description": "Message all of your agents of this type, e.g. Issuer or Merchant, in addition to to_ids.",
+        "title": "Agent Type",
+        "type": "string"
+      }
+    },
+    "required": [
+      "thinking",
+      "message"
+    ],
+    "title": "multicast_agents_messageInput",
+    "type": "object"
+  }
+}'''
@@ -0,0 +1,207 @@
+import dataclasses
+import os
+import zlib
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import (
+    AdvancedJSONEncoder,
+    CompositePayloadConverter,
+    DataConverter,
+    DefaultPayloadConverter,
+    JSONPlainPayloadConverter,
+    PayloadCodec,
+    value_to_type,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+NONE = "none"
+ZLIB = "zlib"
+ZSTD = "zstd"
+COMPRESSED_ENCODINGS = {ZLIB: b"binary/zlib", ZSTD: b"binary/zstd"}
+
+
+class FastJSONPayloadConverter(JSONPlainPayloadConverter):
+    """json/plain with orjson when it is installed, the stdlib json module otherwise.
+
+    Same encoding name, sorted keys and dataclass/datetime encoding as the SDK's converter, so
+    payloads stay readable by clients and workers that do not use it. The bytes are not always
+    identical: number formatting differs, e.g. orjson writes 1e16 where json writes 1e+16.
+    """
+
+    _fallback = AdvancedJSONEncoder()
+    # orjson writes dataclass fields unsorted and datetimes in its own format; both come back
+    # through _default to be encoded the way the SDK's converter does.
+    _options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    @classmethod
+    def _default(cls, value):
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            # One level only, unlike asdict: orjson walks the (large) message lists itself.
+            return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+        return cls._fallback.default(value)
+
+    def to_payload(self, value) -> Payload | None:
+        if orjson is None:
+            return super().to_payload(value)
+        try:
+            data = orjson.dumps(value, default=self._default, option=self._options)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which json handles and orjson does not.
+            return super().to_payload(value)
+        return Payload(metadata={"encoding": self.encoding.encode()}, data=data)
+
+    def from_payload(self, payload: Payload, type_hint: type | None = None):
+        if orjson is None:
+            return super().from_payload(payload, type_hint)
+        try:
+            value = orjson.loads(payload.data)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN and Infinity, which json.dumps writes.
+            return super().from_payload(payload, type_hint)
+        if type_hint:
+            value = value_to_type(type_hint, value, self._custom_type_converters)
+        return value
+
+
+class FastPayloadConverter(CompositePayloadConverter):
+    """The SDK's default payload converter with FastJSONPayloadConverter for json/plain."""
+
+    def __init__(self) -> None:
+        super().__init__(*(
+            FastJSONPayloadConverter() if isinstance(converter, JSONPlainPayloadConverter) else converter
+            for converter in DefaultPayloadConverter.default_encoding_payload_converters
+        ))
+
+
+class CompressionCodec(PayloadCodec):
+    """Compresses payloads of at least min_bytes, when that makes them smaller.
+
+    Small payloads and payloads with other encodings pass through untouched, so history written
+    before the codec was enabled still decodes. Compressed payloads can only be read by clients
+    that use this codec too, the Temporal UI included (through a codec server).
+    """
+
+    def __init__(self, algorithm: str = ZLIB, min_bytes: int = 4096, level: int = 3):
+        if algorithm not in COMPRESSED_ENCODINGS:
+            raise ValueError(f"Unsupported payload compression: {algorithm}")
+        if algorithm == ZSTD and zstandard is None:
+            raise ValueError("zstd payload compression needs the zstandard package")
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.algorithm == ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    @staticmethod
+    def _decompress(encoding: bytes, data: bytes) -> bytes:
+        if encoding == COMPRESSED_ENCODINGS[ZSTD]:
+            if zstandard is None:
+                raise ValueError("Payload is zstd compressed but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    async def encode(self, payloads) -> list[Payload]:
+        encoded = []
+        for payload in payloads:
+            if payload.ByteSize() < self.min_bytes:
+                encoded.append(payload)
+                continue
+            raw = payload.SerializeToString()
+            compressed = self._compress(raw)
+            if len(compressed) >= len(raw):
+                encoded.append(payload)
+                continue
+            encoded.append(Payload(metadata={"encoding": COMPRESSED_ENCODINGS[self.algorithm]}, data=compressed))
+        return encoded
+
+    async def decode(self, payloads) -> list[Payload]:
+        decoded = []
+        for payload in payloads:
+            encoding = payload.metadata.get("encoding", b"")
+            if encoding not in COMPRESSED_ENCODINGS.values():
+                decoded.append(payload)
+                continue
+            decoded.append(Payload.FromString(self._decompress(encoding, payload.data)))
+        return decoded
+
+
+@dataclass(frozen=True)
+class PayloadSettings:
+    """How the framework's Temporal client encodes workflow and activity payloads.
+
+    The defaults are the SDK's own converter, uncompressed. Every client and worker that touches
+    the agents' workflows has to use the same compression setting.
+    """
+    fast_json: bool = False
+    compression: str = NONE
+    compress_min_bytes: int = 4096
+    compression_level: int = 3
+
+    def data_converter(self) -> DataConverter:
+        converter = DataConverter.default
+        if self.fast_json:
+            converter = dataclasses.replace(converter, payload_converter_class=FastPayloadConverter)
+        if self.compression != NONE:
+            converter = dataclasses.replace(
+                converter,
+                payload_codec=CompressionCodec(self.compression, self.compress_min_bytes, self.compression_level),
+            )
+        return converter
+
+
+# Both on, for BaseAgent(payloads="fast").
+FAST_COMPRESSED = PayloadSettings(fast_json=True, compression=ZLIB)
+
+
+def load_payload_settings() -> PayloadSettings:
+    load_dotenv()
+    defaults = PayloadSettings()
+    return PayloadSettings(
+        fast_json=os.environ.get("AGENT_FAST_JSON", "false").lower() in ("1", "true", "yes"),
+        compression=os.environ.get("AGENT_PAYLOAD_COMPRESSION", defaults.compression),
+        compress_min_bytes=int(os.environ.get("AGENT_PAYLOAD_COMPRESS_MIN_BYTES", defaults.compress_min_bytes)),
+        compression_level=int(os.environ.get("AGENT_PAYLOAD_COMPRESSION_LEVEL", defaults.compression_level)),
+    )
+
+
+_settings: PayloadSettings | None = None
+
+
+def get_payload_settings() -> PayloadSettings:
+    global _settings
+    if _settings is None:
+        _settings = load_payload_settings()
+    return _settings
+
+
+def set_payload_settings(settings: PayloadSettings) -> None:
+    """Takes effect for clients connected afterwards."""
+    global _settings
+    _settings = settings
+
+
+def resolve_payload_settings(payloads: PayloadSettings | str | None) -> PayloadSettings:
+    """A PayloadSettings, "fast" or "default"; None reads the AGENT_* environment variables."""
+    if payloads is None:
+        return get_payload_settings()
+    if payloads == "fast":
+        return FAST_COMPRESSED
+    if payloads == "default":
+        return PayloadSettings()
+    if isinstance(payloads, PayloadSettings):
+        return payloads
+    raise ValueError(f"Unknown payload settings: {payloads}")
@@ -0,0 +1,51 @@
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def system_blocks(system_message: str, summary: str = "", cache: bool = True) -> list[dict]:
+    """System prompt as content blocks, with a cache breakpoint after the static part.
+
+    The conversation summary changes on continue-as-new, so it goes after the breakpoint.
+    """
+    static_block = {"type": "text", "text": system_message}
+    if cache:
+        static_block["cache_control"] = EPHEMERAL
+    blocks = [static_block]
+    if summary:
+        blocks.append({"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"})
+    return blocks
+
+
+def cached_tools(tools: list[dict]) -> list[dict]:
+    """Put a breakpoint on the last tool so the whole tool block is cached."""
+    if not tools:
+        return tools
+    return [*tools[:-1], {**tools[-1], "cache_control": EPHEMERAL}]
+
+
+def cached_messages(messages: list[dict]) -> list[dict]:
+    """Put a rolling breakpoint on the last block of the last message.
+
+    The next turn repeats this prefix byte for byte, so it is read back from the cache.
+    Only the last message is copied; the caller's messages are not modified.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    if not content:
+        return messages
+    content = [*content[:-1], {**content[-1], "cache_control": EPHEMERAL}]
+    return [*messages[:-1], {**last, "content": content}]
+
+
+def cache_usage(usage: dict | None) -> dict:
+    """The token counts of one response, including prompt-cache reads and writes."""
+    usage = usage or {}
+    return {
+        "input_tokens": usage.get("input_tokens") or 0,
+        "output_tokens": usage.get("output_tokens") or 0,
+        "cache_creation_input_tokens": usage.get("cache_creation_input_tokens") or 0,
+        "cache_read_input_tokens": usage.get("cache_read_input_tokens") or 0,
+    }
@@ -0,0 +1,34 @@
+import heapq
+
+
+class ReminderQueue:
+    """A workflow's pending reminders as a min-heap on due time.
+
+    Reminders due at the same time come out in the order they were added. pending() lists them
+    for CarriedState, and ReminderQueue(pending) rebuilds the queue in the next run.
+    """
+
+    def __init__(self, pending: list[dict] | None = None):
+        # (due_at, reminder_id, reminder); the id breaks ties so reminder dicts are never compared.
+        self._heap = []
+        self._next_id = 0
+        for reminder in pending or []:
+            self.add(reminder["due_at"], reminder["time"], reminder["message"])
+
+    def add(self, due_at: float, time: int, message: str) -> None:
+        reminder = {"due_at": due_at, "time": time, "message": message}
+        heapq.heappush(self._heap, (due_at, self._next_id, reminder))
+        self._next_id += 1
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_due_at(self) -> float | None:
+        return self._heap[0][0] if self._heap else None
+
+    def pop(self) -> dict:
+        return heapq.heappop(self._heap)[2]
+
+    def pending(self) -> list[dict]:
+        """Every pending reminder, earliest first."""
+        return [reminder for _, _, reminder in sorted(self._heap)]
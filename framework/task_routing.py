@@ -0,0 +1,76 @@
+import os
+import zlib
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from temporalio.common import Priority
+
+# Task queue modes. per_agent is the original layout: one queue (and worker) per agent.
+PER_AGENT = "per_agent"
+SHARED = "shared"
+HASHED = "hashed"
+
+
+@dataclass(frozen=True)
+class TaskQueueRouting:
+    """Which task queue an agent's workflow runs on.
+
+    In shared and hashed mode one pool of workers serves many agents; each workflow still gets
+    its own agent config (see AgentConfigRegistry.resolve) and can be tagged with a fairness key
+    so a busy tenant does not starve the others on the shared queues.
+    """
+    mode: str = PER_AGENT
+    shared_queue: str = "agents-queue"
+    hashed_queue_count: int = 8
+    fair_scheduling: bool = True
+
+    def task_queue_for(self, agent_id: str) -> str:
+        if self.mode == PER_AGENT:
+            return agent_id + "-queue"
+        if self.mode == SHARED:
+            return self.shared_queue
+        if self.mode == HASHED:
+            # crc32 rather than hash() so every process maps an agent to the same queue.
+            return f"{self.shared_queue}-{zlib.crc32(agent_id.encode('utf-8')) % self.hashed_queue_count}"
+        raise ValueError(f"Unknown task queue mode: {self.mode}")
+
+    def pool_task_queues(self) -> list[str]:
+        """Every queue a shared worker pool has to poll."""
+        if self.mode == SHARED:
+            return [self.shared_queue]
+        if self.mode == HASHED:
+            return [f"{self.shared_queue}-{index}" for index in range(self.hashed_queue_count)]
+        raise ValueError("per_agent routing has no shared queues")
+
+    def priority_for(self, tenant_id: str) -> Priority:
+        """Fairness key for the tenant's workflow; its activities inherit it."""
+        if self.mode == PER_AGENT or not self.fair_scheduling:
+            return Priority.default
+        return Priority(fairness_key=tenant_id)
+
+
+def load_task_queue_routing() -> TaskQueueRouting:
+    load_dotenv()
+    defaults = TaskQueueRouting()
+    return TaskQueueRouting(
+        mode=os.environ.get("AGENT_TASK_QUEUE_MODE", defaults.mode),
+        shared_queue=os.environ.get("AGENT_SHARED_TASK_QUEUE", defaults.shared_queue),
+        hashed_queue_count=int(os.environ.get("AGENT_TASK_QUEUE_COUNT", defaults.hashed_queue_count)),
+        fair_scheduling=os.environ.get("AGENT_FAIR_SCHEDULING", "true").lower() in ("1", "true", "yes"),
+    )
+
+
+_routing: TaskQueueRouting | None = None
+
+
+def get_task_queue_routing() -> TaskQueueRouting:
+    """Process-wide routing, configured with AGENT_TASK_QUEUE_MODE and friends."""
+    global _routing
+    if _routing is None:
+        _routing = load_task_queue_routing()
+    return _routing
+
+
+def set_task_queue_routing(routing: TaskQueueRouting) -> None:
+    global _routing
+    _routing = routing
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from temporalio.client import Client
+from temporalio.runtime import Runtime
+from temporalio.service import RPCError, RPCStatusCode
+
+from agent_logging import get_logger
+from payload_codec import get_payload_settings
+
+HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+log = get_logger("temporal_client")
+
+# Process-wide connection shared by the worker and every framework activity.
+_client: Client | None = None
+_lock: asyncio.Lock | None = None
+_last_healthy_at = 0.0
+_counters = None
+
+client_stats = {"connects": 0, "reuses": 0, "reconnects": 0}
+
+
+def _count(name: str) -> None:
+    global _counters
+    client_stats[name] += 1
+    if _counters is None:
+        meter = Runtime.default().metric_meter
+        _counters = {
+            key: meter.create_counter(f"agent_temporal_client_{key}", f"Temporal client {key} in this worker process")
+            for key in client_stats
+        }
+    _counters[name].add(1)
+
+
+async def _connect() -> Client:
+    load_dotenv()
+    return await Client.connect(
+        os.environ.get("TEMPORAL_ADDRESS", "localhost:7233"),
+        # Workers built on this client encode with the same converter and codec.
+        data_converter=get_payload_settings().data_converter(),
+    )
+
+
+async def _is_healthy(client: Client) -> bool:
+    global _last_healthy_at
+    if time.monotonic() - _last_healthy_at < HEALTH_CHECK_INTERVAL_SECONDS:
+        return True
+    try:
+        healthy = await client.service_client.check_health(timeout=timedelta(seconds=5))
+    except RPCError:
+        healthy = False
+    if healthy:
+        _last_healthy_at = time.monotonic()
+    return healthy
+
+
+async def get_temporal_client() -> Client:
+    """Return the shared client, connecting lazily and reconnecting if its channel is unhealthy."""
+    global _client, _lock, _last_healthy_at
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        if _client is not None:
+            if await _is_healthy(_client):
+                _count("reuses")
+                return _client
+            log.warning("Temporal client unhealthy, reconnecting")
+            _count("reconnects")
+        _client = await _connect()
+        _last_healthy_at = time.monotonic()
+        _count("connects")
+        return _client
+
+
+def set_temporal_client(client: Client) -> None:
+    """Share an already connected client with the framework activities."""
+    global _client, _last_healthy_at
+    _client = client
+    _last_healthy_at = time.monotonic()
+
+
+def invalidate_temporal_client(error: Exception | None = None) -> None:
+    """Force a health check on next use, e.g. after an RPC failed because the channel went away."""
+    global _last_healthy_at
+    if error is None or (isinstance(error, RPCError) and error.status == RPCStatusCode.UNAVAILABLE):
+        _last_healthy_at = 0.0
+
+
+def temporal_client_stats() -> dict:
+    total = client_stats["connects"] + client_stats["reuses"]
+    return {**client_stats, "reuse_ratio": client_stats["reuses"] / total if total else 0.0}
@@ -0,0 +1,28 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from workflow_types import ToolConcurrencyPolicy
+
+
+class ToolConcurrencyLimiter:
+    """Slots for one agent's tool activities: max_concurrent overall, per_tool by activity name.
+
+    Built on asyncio.Semaphore, which is deterministic inside a workflow.
+    """
+
+    def __init__(self, policy: ToolConcurrencyPolicy):
+        self.policy = policy
+        self._global = asyncio.Semaphore(policy.max_concurrent)
+        self._per_tool: dict[str, asyncio.Semaphore] = {}
+
+    def _tool_semaphore(self, activity_name: str) -> asyncio.Semaphore:
+        if activity_name not in self._per_tool:
+            limit = self.policy.per_tool.get(activity_name, self.policy.max_concurrent)
+            self._per_tool[activity_name] = asyncio.Semaphore(limit)
+        return self._per_tool[activity_name]
+
+    @asynccontextmanager
+    async def slot(self, activity_name: str):
+        # Take the per-tool slot first so a queued call does not hold a global slot while it waits.
+        async with self._tool_semaphore(activity_name), self._global:
+            yield
@@ -0,0 +1,181 @@
+import json
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from calculator_tool import calculator
+from multicast_message import multicast_agents_message
+from schedule_reminder import schedule_reminder
+from tool_1 import send_opeator_message
+from tool_2 import send_agents_message
+from wait_for_assistance import wait_for_assistance
+
+TOOL_NAME_PATTERN = re.compile(r"^[a-zA-Z0-9_-]{1,64}$")
+
+# How a tool_use block is executed.
+ACTIVITY = "activity"
+LOCAL_ACTIVITY = "local_activity"
+WORKFLOW = "workflow"
+
+
+class ToolSchemaError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ToolHandler:
+    kind: str
+    # Activity name for (local) activities, BaseAgentWorkflow method name for in-workflow tools.
+    target: str
+
+
+@dataclass(frozen=True)
+class RegisteredTool:
+    name: str
+    schema: MappingProxyType
+    schema_bytes: bytes
+    handler: ToolHandler
+
+    def as_dict(self) -> dict:
+        return json.loads(self.schema_bytes)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Model-written tool input is not validated against the schema by the API, so the in-workflow
+# handlers read it through these and report ValueError/TypeError/KeyError back to the model.
+
+def input_str(tool_input: dict, key: str) -> str:
+    """A required string field of a tool's input."""
+    value = tool_input[key]
+    if not isinstance(value, str):
+        raise TypeError(f"{key} must be a string")
+    return value
+
+
+def input_list(tool_input: dict, key: str, item_type: type) -> list:
+    """An optional list field of a tool's input; models sometimes send it JSON-encoded."""
+    value = tool_input.get(key, [])
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, list) or not all(isinstance(item, item_type) for item in value):
+        raise TypeError(f"{key} must be a list of {'objects' if item_type is dict else 'strings'}")
+    return value
+
+
+def describe_tool_input_error(error: Exception) -> str:
+    if isinstance(error, KeyError):
+        return f"missing required field {error.args[0]!r}"
+    if isinstance(error, json.JSONDecodeError):
+        return f"not valid JSON ({error.msg})"
+    return str(error)
+
+
+def normalize_tool_schema(schema: dict | str) -> dict:
+    """Parse and validate a tool schema, accepting the older layouts used in this repo.
+
+    JSON strings, OpenAI-style {"type": "function", "function": {...}} wrappers and
+    "parameters" / "input schema" in place of "input_schema" are all converted.
+    """
+    if isinstance(schema, str):
+        schema = json.loads(schema)
+    if schema.get("type") == "function" and isinstance(schema.get("function"), dict):
+        schema = schema["function"]
+    schema = dict(schema)
+    for legacy_key in ("parameters", "input schema"):
+        if legacy_key in schema and "input_schema" not in schema:
+            schema["input_schema"] = schema.pop(legacy_key)
+    name = schema.get("name")
+    if not isinstance(name, str) or not TOOL_NAME_PATTERN.match(name):
+        raise ToolSchemaError(f"Invalid tool name: {name!r}")
+    if not isinstance(schema.get("description", ""), str):
+        raise ToolSchemaError(f"{name}: description must be a string")
+    input_schema = schema.get("input_schema")
+    if not isinstance(input_schema, dict) or input_schema.get("type", "object") != "object":
+        raise ToolSchemaError(f"{name}: input_schema must be an object schema")
+    return schema
+
+
+class ToolRegistry:
+    """Validated, frozen tool schemas and their handlers, looked up by tool name."""
+
+    def __init__(self, tools: dict[str, RegisteredTool] | None = None):
+        self._tools = dict(tools or {})
+        self._schemas = None
+
+    def register(self, schema: dict | str, handler: ToolHandler, name: str | None = None) -> RegisteredTool:
+        schema = normalize_tool_schema(schema)
+        if name is not None:
+            schema["name"] = name
+        tool = RegisteredTool(
+            name=schema["name"],
+            schema=_freeze(schema),
+            schema_bytes=json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8"),
+            handler=handler,
+        )
+        self._tools[tool.name] = tool
+        self._schemas = None
+        return tool
+
+    def get(self, name: str) -> RegisteredTool | None:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def names(self) -> list[str]:
+        return list(self._tools)
+
+    def schemas(self) -> list[dict]:
+        """Tool schemas for LLMState.tools. The same list is returned until the registry changes."""
+        if self._schemas is None:
+            self._schemas = [tool.as_dict() for tool in self._tools.values()]
+        return self._schemas
+
+    def schemas_for(self, names) -> list[dict]:
+        """Schemas of the named tools, in the given order."""
+        unknown = [name for name in names if name not in self._tools]
+        if unknown:
+            raise ToolSchemaError(f"Unknown built-in tools: {', '.join(unknown)}")
+        return [self._tools[name].as_dict() for name in names]
+
+    def for_agent(self, tools: list[dict | str], additional_tools: list[dict | str]) -> "ToolRegistry":
+        """The tools one agent config exposes, in config order.
+
+        Tools this registry does not know are handled by the activity of the same name.
+        """
+        registry = ToolRegistry()
+        for schema in [*tools, *additional_tools]:
+            schema = normalize_tool_schema(schema)
+            builtin = self.get(schema["name"])
+            if builtin is not None:
+                registry._tools[builtin.name] = builtin
+            else:
+                registry.register(schema, ToolHandler(ACTIVITY, schema["name"]))
+        return registry
+
+
+def build_builtin_tool_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.register(send_agents_message(), ToolHandler(WORKFLOW, "_send_agent_messages"))
+    registry.register(multicast_agents_message(), ToolHandler(WORKFLOW, "_multicast_agent_message"))
+    registry.register(send_opeator_message(), ToolHandler(WORKFLOW, "_notify_operator"), name="send_operator_message")
+    registry.register(schedule_reminder(), ToolHandler(WORKFLOW, "_schedule_reminder"))
+    registry.register(wait_for_assistance(), ToolHandler(WORKFLOW, "_wait_for_assistance"))
+    registry.register(calculator(), ToolHandler(ACTIVITY, "calculator"))
+    return registry
+
+
+# What BaseAgent offers unless an agent opts into more built-ins with BaseAgent(tools=[...]),
+# e.g. "calculator", "schedule_reminder", "wait_for_assistance" or "multicast_agents_message".
+# Each extra tool makes every request's tool block larger.
+DEFAULT_TOOL_NAMES = ("send_agents_message", "send_operator_message")
+
+# Built once per worker process; workflows extend it with their agent's additional tools.
+builtin_tool_registry = build_builtin_tool_registry()
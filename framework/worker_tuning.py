@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+
+from temporalio.worker import PollerBehaviorSimpleMaximum, ResourceBasedSlotConfig, WorkerTuner
+
+from task_routing import PER_AGENT
+
+# Activities that wait on the LLM API. With WorkerTuning.llm_task_queue they run on their own
+# task queue, "<task queue>-llm", so slow model calls never hold the slots of cheap tool activities.
+# The setting is written to the agent's config and read by its workflow; workers poll "-llm" as
+# described in polls_llm_task_queue.
+LLM_ACTIVITY_NAMES = ("llm_call", "summarize_conversation")
+LLM_TASK_QUEUE_SUFFIX = "-llm"
+
+
+@dataclass(frozen=True)
+class WorkerTuning:
+    """Worker sizing for BaseAgent. None leaves the Temporal SDK default."""
+    max_concurrent_workflow_tasks: int | None = None
+    # Sticky cache of workflow runs kept in memory between tasks (the SDK default is 1000).
+    max_cached_workflows: int = 1000
+    workflow_task_pollers: int | None = None
+    max_concurrent_local_activities: int | None = None
+    # Main task queue: tool activities, plus LLM calls of agents whose config has no llm_task_queue.
+    max_concurrent_activities: int | None = None
+    activity_task_pollers: int | None = None
+    # Thread pool for non-async activities. The framework's own activities are all async.
+    activity_executor_workers: int | None = None
+    llm_task_queue: bool = False
+    llm_max_concurrent_activities: int | None = None
+    llm_activity_task_pollers: int | None = None
+    # Size slots by host CPU and memory instead of fixed counts; the max_concurrent_* values become upper bounds.
+    resource_based: bool = False
+    target_memory_usage: float = 0.8
+    target_cpu_usage: float = 0.9
+    graceful_shutdown_seconds: float = 0.0
+
+    def worker_options(self, llm: bool = False) -> dict:
+        """Keyword arguments for temporalio.worker.Worker, for the main or the LLM worker."""
+        max_activities = self.llm_max_concurrent_activities if llm else self.max_concurrent_activities
+        activity_pollers = self.llm_activity_task_pollers if llm else self.activity_task_pollers
+        options = {
+            "max_cached_workflows": 0 if llm else self.max_cached_workflows,
+            "graceful_shutdown_timeout": timedelta(seconds=self.graceful_shutdown_seconds),
+        }
+        if self.resource_based:
+            options["tuner"] = WorkerTuner.create_resource_based(
+                target_memory_usage=self.target_memory_usage,
+                target_cpu_usage=self.target_cpu_usage,
+                workflow_config=ResourceBasedSlotConfig(maximum_slots=self.max_concurrent_workflow_tasks),
+                activity_config=ResourceBasedSlotConfig(maximum_slots=max_activities),
+                local_activity_config=ResourceBasedSlotConfig(maximum_slots=self.max_concurrent_local_activities),
+            )
+        else:
+            options["max_concurrent_workflow_tasks"] = self.max_concurrent_workflow_tasks
+            options["max_concurrent_activities"] = max_activities
+            options["max_concurrent_local_activities"] = self.max_concurrent_local_activities
+        if self.workflow_task_pollers is not None and not llm:
+            options["workflow_task_poller_behavior"] = PollerBehaviorSimpleMaximum(self.workflow_task_pollers)
+        if activity_pollers is not None:
+            options["activity_task_poller_behavior"] = PollerBehaviorSimpleMaximum(activity_pollers)
+        if self.activity_executor_workers is not None:
+            options["activity_executor"] = ThreadPoolExecutor(max_workers=self.activity_executor_workers)
+        return options
+
+
+# Agents that mostly wait on long model calls: many concurrent LLM activities on their own queue,
+# modest workflow task and tool capacity.
+LLM_HEAVY = WorkerTuning(
+    max_concurrent_workflow_tasks=50,
+    max_cached_workflows=2000,
+    max_concurrent_activities=50,
+    llm_task_queue=True,
+    llm_max_concurrent_activities=200,
+    llm_activity_task_pollers=10,
+)
+
+# Agents that fan messages and tool calls out to many others: lots of short activities and
+# workflow tasks, LLM calls kept on a separate, smaller queue.
+FAN_OUT_HEAVY = WorkerTuning(
+    max_concurrent_workflow_tasks=200,
+    max_cached_workflows=5000,
+    workflow_task_pollers=10,
+    max_concurrent_local_activities=200,
+    max_concurrent_activities=500,
+    activity_task_pollers=20,
+    llm_task_queue=True,
+    llm_max_concurrent_activities=50,
+)
+
+WORKER_TUNING_PRESETS = {
+    "default": WorkerTuning(),
+    "llm_heavy": LLM_HEAVY,
+    "fan_out_heavy": FAN_OUT_HEAVY,
+}
+
+
+def polls_llm_task_queue(tuning: WorkerTuning, routing, task_queue: str, snapshots) -> bool:
+    """Whether a worker on task_queue also has to poll task_queue + "-llm".
+
+    An agent's own config decides where its workflow sends llm_call. In shared and hashed mode the
+    pool serves agents whose configs can be written after it started, so it always polls "-llm".
+    A per-agent worker writes its agent's config before it starts, so its snapshots are complete.
+    """
+    if tuning.llm_task_queue or routing.mode != PER_AGENT:
+        return True
+    return any(
+        snapshot.settings.get("llm_task_queue") and routing.task_queue_for(snapshot.user_id) == task_queue
+        for snapshot in snapshots
+    )
+
+
+def resolve_worker_tuning(tuning: "WorkerTuning | str | None") -> WorkerTuning:
+    if tuning is None:
+        return WorkerTuning()
+    if isinstance(tuning, str):
+        if tuning not in WORKER_TUNING_PRESETS:
+            raise ValueError(f"Unknown worker tuning preset: {tuning}")
+        return WORKER_TUNING_PRESETS[tuning]
+    return tuning
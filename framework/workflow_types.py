@@ -0,0 +1,182 @@
+from dataclasses import dataclass, field
+
+# State, policies and parameters passed between BaseAgentWorkflow and its activities. No
+# third-party imports here, so modules that only need these types do not pull in the activities'.
+
+
+@dataclass
+class LLMState:
+    user_id: str = ""
+    persona_type: str = ""
+    run_id: str = ""
+    system_message: str = ""
+    language: str = ""
+    messages: list[dict] = field(default_factory=list)
+    tools: list [dict] = field(default_factory=list)
+    agents: dict = field(default_factory=dict)
+    summary: str = ""
+    # Cached token counts: message_tokens[i] belongs to messages[i], token_total is their sum and
+    # overhead_tokens covers system prompt, summary and tools. The first confirmed_messages counts
+    # have been corrected from API usage. See conversation.append_message.
+    message_tokens: list[int] = field(default_factory=list)
+    token_total: int = 0
+    overhead_tokens: int = 0
+    confirmed_messages: int = 0
+    prompt_caching: bool = True
+    stream: bool = False
+    response_cache: bool = True
+    # Out-of-band conversation store: when message_refs is set, system_message, tools and
+    # messages are sent as content hashes and llm_call rehydrates them from the MessageStore.
+    # blobs carries the bodies the store has not seen yet, keyed by hash.
+    system_ref: str = ""
+    tools_ref: str = ""
+    message_refs: list[str] = field(default_factory=list)
+    blobs: dict[str, str] = field(default_factory=dict)
+    #response format: dict | None = None
+
+@dataclass
+class ContinueAsNewPolicy:
+    enabled: bool = False
+    max_history_events: int = 10000
+    max_history_bytes: int = 20 * 1024 * 1024
+    max_turns: int = 200
+    keep_last_turns: int = 10
+
+@dataclass
+class MessageBatchingPolicy:
+    """Coalesce queued input messages into one user turn.
+
+    After the first message arrives the workflow waits up to debounce_seconds, or until
+    max_batch messages are queued, and then drains them in arrival order.
+    """
+    enabled: bool = False
+    debounce_seconds: float = 2.0
+    max_batch: int = 10
+
+@dataclass
+class ToolConcurrencyPolicy:
+    """Caps on tool activities running at once for one agent, overall and per activity name."""
+    max_concurrent: int = 8
+    per_tool: dict[str, int] = field(default_factory=dict)
+
+@dataclass
+class LLMStreamingPolicy:
+    """Stream llm_call responses and bound them by heartbeats instead of a fixed total timeout."""
+    enabled: bool = False
+    heartbeat_timeout_seconds: float = 60.0
+    start_to_close_timeout_minutes: float = 30.0
+    maximum_attempts: int = 2
+
+@dataclass
+class ContextWindowPolicy:
+    # One of "none", "sliding_window", "keep_first_and_last" or "summarize_older".
+    strategy: str = "none"
+    # Token budget for a whole request: system prompt, summary, tools and messages.
+    max_tokens: int = 150000
+    # When over budget, trim to this share of it so the cut point (and the prompt-cache prefix)
+    # stays put for the next few turns.
+    trim_to_ratio: float = 0.75
+    keep_first_turns: int = 1
+
+@dataclass
+class CarriedState:
+    """State handed from one run of BaseAgentWorkflow to the next on continue-as-new."""
+    llm_state: LLMState
+    input_message_queue: list = field(default_factory=list)
+    pending_reminders: list[dict] = field(default_factory=list)
+    # Position of llm_state.messages[0] in the agent's whole conversation; see BaseAgentWorkflow.get_messages.
+    message_offset: int = 0
+    total_turns: int = 0
+
+@dataclass
+class MessagesQuery:
+    # Position in the whole conversation to read from; pass back next_cursor from the previous page.
+    cursor: int = 0
+    limit: int = 50
+
+@dataclass
+class StateQuery:
+    # LLMState fields and/or last_turn_usage, usage_totals, last_turn_timing, config_version.
+    fields: list[str] = field(default_factory=list)
+
+@dataclass
+class InvocationParams:
+    user_id: str
+    run_id: str
+    agent_type: str
+    carried_state: CarriedState | None = None
+
+@dataclass(frozen=True)
+class AgentConfigSnapshot:
+    """An agent config as loaded at one point in time. version is the hash of its content."""
+    agent_type: str
+    user_id: str
+    version: str
+    system_msg: str
+    language: str = "English"
+    agents: dict = field(default_factory=dict)
+    tools: list[dict] = field(default_factory=list)
+    additional_tools: list[dict] = field(default_factory=list)
+    # Everything else in the file, e.g. the policies written by BaseAgent.
+    settings: dict = field(default_factory=dict)
+
+@dataclass
+class AgentConfigRequest:
+    agent_type: str
+    user_id: str
+    # Workflow IDs are "<agent_type>_<user_id>_<run_id>"; on shared task queues this is what identifies the agent.
+    workflow_id: str = ""
+
+@dataclass
+class UserMessageParams:
+    message: str
+    user_id: str
+
+@dataclass
+class AgentMessageParams:
+    to_id: str
+    message: str
+    run_id: str
+    # The recipient's type as the model wrote it; only used when no agent config names to_id.
+    agent_type: str = ""
+    user_id: str = ""
+    # Deprecated: the agent directory resolves recipients. Still read for workflows started before it.
+    agents: dict = field(default_factory=dict)
+
+@dataclass
+class MulticastParams:
+    message: str
+    run_id: str
+    user_id: str = ""
+    # The sender's own agent type, to find its config and so its colleagues for the agent_type selector.
+    sender_type: str = ""
+    to_ids: list[str] = field(default_factory=list)
+    # Also send to every agent of this type the sender knows (case-insensitive), e.g. "Issuer".
+    agent_type: str = ""
+    max_parallel: int = 8
+
+@dataclass
+class ScheduleParams:
+    time: int
+    message: str
+    user_id: str = ""
+    run_id: str = ""
+    persona_type: str = ""
+
+@dataclass
+class ModelOutputParams:
+    contemplation: str
+    colleague_messages: list [dict[str, str]] = field(default_factory=list)
+    user_message: str | None = None
+
+@dataclass
+class CalculatorParams:
+    """A calculator that can evaluate basic mathematical expressions"""
+    
+    expression: str
+
+@dataclass
+class SummarizeParams:
+    messages: list[dict]
+    previous_summary: str = ""
+    language: str = ""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The framework modules import each other by their flat names, as the workers run them.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "framework"))
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from agent_config import AgentConfigRegistry
+
+
+def write_config(directory, agent_type, user_id, **config):
+    with open(directory / f"{agent_type}_{user_id}.json", "w") as f:
+        json.dump({"system_msg": f"{agent_type} {user_id}", "user_id": user_id, **config}, f)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    write_config(tmp_path, "issuer", "HDFC")
+    write_config(tmp_path, "issuer", "HDFC_Cards")
+    write_config(tmp_path, "consumer", "Anil", agents={"HDFC": {"type": "Issuer"}})
+    registry = AgentConfigRegistry(str(tmp_path))
+    assert registry.load_all() == 3
+    return registry
+
+
+def test_resolve_by_workflow_id(registry):
+    assert registry.resolve("consumer_Anil_run1").user_id == "Anil"
+    assert registry.resolve("unknown_Anil_run1") is None
+
+
+def test_resolve_prefers_the_longest_prefix(registry):
+    assert registry.resolve("issuer_HDFC_run1").user_id == "HDFC"
+    assert registry.resolve("issuer_HDFC_Cards_run1").user_id == "HDFC_Cards"
+
+
+def test_load_all_skips_bad_files(tmp_path, registry):
+    (tmp_path / "merchant_Half.json").write_text('{"system_msg": "x", "us')
+    write_config(tmp_path, "merchant", "Bad", tools="not a list")
+    assert registry.load_all() == 3
+    assert registry.resolve("merchant_Bad_run1") is None
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from temporalio.service import RPCError, RPCStatusCode
+
+import agent_directory
+from agent_config import AgentConfigRegistry
+from agent_directory import AgentDirectory, UnknownAgentError, deliver_each
+from task_routing import HASHED, TaskQueueRouting
+from test_agent_config import write_config
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class Client:
+    def get_workflow_handle(self, workflow_id):
+        return ("handle", workflow_id)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(agent_directory, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def configs(tmp_path, monkeypatch):
+    write_config(tmp_path, "issuer", "HDFC")
+    write_config(tmp_path, "consumer", "Anil", agents={"HDFC": {"type": "Bank"}, "Croma": {"type": "Merchant"}})
+    registry = AgentConfigRegistry(str(tmp_path))
+    registry.load_all()
+    monkeypatch.setattr(agent_directory, "agent_config_registry", registry)
+    routing = TaskQueueRouting(mode=HASHED, hashed_queue_count=4)
+    monkeypatch.setattr(agent_directory, "get_task_queue_routing", lambda: routing)
+    return tmp_path
+
+
+def test_resolve_prefers_the_agents_own_config(configs, clock):
+    directory = AgentDirectory()
+    address = directory.resolve("HDFC", "run1")
+    assert address.agent_type == "issuer"
+    assert address.workflow_id == "issuer_HDFC_run1"
+    assert address.task_queue == TaskQueueRouting(mode=HASHED, hashed_queue_count=4).task_queue_for("HDFC")
+    # Only described by a colleague; the model's hint is not needed.
+    assert directory.resolve("Croma", "run1", hint="shop").agent_type == "Merchant"
+    assert directory.resolve("Reliance", "run1", hint="Merchant").workflow_id == "merchant_Reliance_run1"
+    with pytest.raises(UnknownAgentError):
+        directory.resolve("Reliance", "run1")
+
+
+def test_lookup_caches_handles_until_the_ttl(configs, clock):
+    directory = AgentDirectory(ttl_seconds=60)
+    client = Client()
+    entry = directory.lookup(client, "HDFC", "run1")
+    assert entry.handle == ("handle", "issuer_HDFC_run1")
+    clock.now += 59
+    assert directory.lookup(client, "HDFC", "run1") is entry
+    clock.now += 2
+    assert directory.lookup(client, "HDFC", "run1") is not entry
+    assert directory.stats == {"hits": 1, "misses": 2, "invalidations": 0}
+
+
+def test_a_new_client_or_an_invalidation_forces_a_lookup(configs, clock):
+    directory = AgentDirectory()
+    client = Client()
+    entry = directory.lookup(client, "HDFC", "run1")
+    assert directory.lookup(Client(), "HDFC", "run1") is not entry
+    entry = directory.lookup(client, "HDFC", "run1")
+    directory.invalidate("HDFC", "run1")
+    assert directory.lookup(client, "HDFC", "run1") is not entry
+    assert directory.stats["invalidations"] == 1
+
+
+def test_invalidating_everything_reloads_agent_types(configs, clock):
+    directory = AgentDirectory()
+    assert directory.agent_type("Croma") == "Merchant"
+    write_config(configs, "merchant", "Croma")
+    agent_directory.agent_config_registry.load_all()
+    # Still the cached type until the TTL passes or the directory is invalidated.
+    assert directory.agent_type("Croma") == "Merchant"
+    directory.invalidate()
+    assert directory.agent_type("Croma") == "merchant"
+
+
+def test_agents_of_type_only_sees_the_senders_colleagues(configs, clock):
+    write_config(configs, "consumer", "Ravi", agents={"ICICI": {"type": "Bank"}})
+    directory = AgentDirectory()
+    assert directory.agents_of_type("bank", "Anil", "consumer") == ["HDFC"]
+    assert directory.agents_of_type("bank", "Ravi", "consumer") == ["ICICI"]
+    # No config for the sender here: nobody, rather than every bank this worker knows.
+    assert directory.agents_of_type("bank", "Mallory", "consumer") == []
+
+
+def test_multicast_recipients_are_unique_and_exclude_the_sender(configs, clock):
+    directory = AgentDirectory()
+    assert directory.multicast_recipients(["Croma", "HDFC", "Croma", "Anil"], "Bank", "Anil", "consumer") == ["Croma", "HDFC"]
+    assert directory.multicast_recipients([], "Merchant", "Anil", "consumer") == ["Croma"]
+
+
+def test_deliver_each_reports_every_recipient():
+    in_flight = 0
+    peak = 0
+
+    async def deliver(to_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if to_id == "Nobody":
+            raise UnknownAgentError(to_id)
+        if to_id == "Down":
+            raise RPCError("unavailable", RPCStatusCode.UNAVAILABLE, b"")
+
+    statuses = asyncio.run(deliver_each(["HDFC", "Nobody", "Down", "ICICI"], deliver, max_parallel=2))
+    assert statuses == [
+        {"to_id": "HDFC", "status": "sent"},
+        {"to_id": "Nobody", "status": "unknown_agent"},
+        {"to_id": "Down", "status": "failed", "error": "unavailable"},
+        {"to_id": "ICICI", "status": "sent"},
+    ]
+    assert peak == 2
@@ -0,0 +1,76 @@
+import asyncio
+
+from context_window import ContextWindowManager, KeepFirstAndLastStrategy, SlidingWindowStrategy
+from conversation import append_message, turn_start_indices
+from test_conversation import conversation
+from workflow_types import ContextWindowPolicy, LLMState
+
+
+def state_with_turns(turns: int, tokens_per_message: int = 100) -> LLMState:
+    state = LLMState()
+    for message in conversation(turns):
+        append_message(state, message, tokens=tokens_per_message)
+    return state
+
+
+async def no_summary(messages, summary):
+    raise AssertionError("not a summarizing strategy")
+
+
+def test_sliding_window_keeps_the_newest_turns_that_fit():
+    assert SlidingWindowStrategy().select([100, 100, 100, 100], 250) == [2, 3]
+
+
+def test_sliding_window_always_keeps_the_last_turn():
+    assert SlidingWindowStrategy().select([100, 500], 100) == [1]
+
+
+def test_keep_first_and_last_keeps_the_opening_turn():
+    assert KeepFirstAndLastStrategy(keep_first_turns=1).select([100, 100, 100, 100], 250) == [0, 3]
+
+
+def test_prepare_leaves_state_under_budget_alone():
+    state = state_with_turns(3)
+    manager = ContextWindowManager(ContextWindowPolicy(strategy="sliding_window", max_tokens=10000))
+    assert asyncio.run(manager.prepare(state, no_summary)) is state
+
+
+def test_prepare_trims_to_budget_at_turn_boundaries():
+    state = state_with_turns(6)
+    # 300 tokens per turn; trimmed to 0.75 * 1000 = 750, so the last two turns.
+    manager = ContextWindowManager(ContextWindowPolicy(strategy="sliding_window", max_tokens=1000, trim_to_ratio=0.75))
+    trimmed = asyncio.run(manager.prepare(state, no_summary))
+    assert trimmed is not state
+    assert trimmed.messages == state.messages[-6:]
+    assert trimmed.token_total == 600
+    assert turn_start_indices(trimmed.messages)[0] == 0
+    assert len(state.messages) == 18
+
+
+def test_prepare_keeps_excluding_trimmed_turns_while_under_budget():
+    state = state_with_turns(6)
+    manager = ContextWindowManager(ContextWindowPolicy(strategy="sliding_window", max_tokens=1000, trim_to_ratio=0.75))
+    asyncio.run(manager.prepare(state, no_summary))
+    for message in conversation(1):
+        append_message(state, message, tokens=100)
+    trimmed = asyncio.run(manager.prepare(state, no_summary))
+    # The cut point stays put (for the prompt cache) until the budget is exceeded again.
+    assert trimmed.messages == state.messages[-9:]
+
+
+def test_summarize_older_folds_dropped_turns_into_the_summary():
+    state = state_with_turns(6)
+    summarized = []
+
+    async def summarize(messages, summary):
+        summarized.extend(messages)
+        return "summary"
+
+    manager = ContextWindowManager(ContextWindowPolicy(strategy="summarize_older", max_tokens=1000, trim_to_ratio=0.75))
+    original = list(state.messages)
+    prepared = asyncio.run(manager.prepare(state, summarize))
+    assert prepared is state
+    assert state.summary == "summary"
+    assert summarized == original[:12]
+    assert state.messages == original[12:]
+    assert state.message_tokens == [100] * 6
@@ -0,0 +1,170 @@
+import asyncio
+from types import SimpleNamespace
+
+from temporalio.converter import DataConverter
+
+from conversation import (
+    append_message,
+    calibrate_token_counts,
+    carry_over_state,
+    ensure_token_counts,
+    message_page,
+    restore_carried_state,
+    split_for_compaction,
+    split_turns,
+    take_input_batch,
+    turn_start_indices,
+)
+from workflow_types import CarriedState, InvocationParams, LLMState, MessageBatchingPolicy
+
+
+def user(text):
+    return {"role": "user", "content": text}
+
+
+def tool_use(tool_id):
+    return {"role": "assistant", "content": [{"type": "tool_use", "id": tool_id, "name": "calculator", "input": {}}]}
+
+
+def tool_result(tool_id):
+    return {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": "4"}]}
+
+
+def conversation(turns):
+    """Each turn: a user message, an assistant tool_use and the tool_result for it."""
+    messages = []
+    for index in range(turns):
+        messages += [user(f"request {index}"), tool_use(f"t{index}"), tool_result(f"t{index}")]
+    return messages
+
+
+def state(messages, overhead_tokens=0):
+    state = SimpleNamespace(messages=messages, message_tokens=[], token_total=0, confirmed_messages=0, overhead_tokens=overhead_tokens)
+    ensure_token_counts(state)
+    return state
+
+
+def assert_no_split_tool_calls(messages):
+    used = {block["id"] for message in messages for block in message["content"] if isinstance(message["content"], list) and block["type"] == "tool_use"}
+    results = {block["tool_use_id"] for message in messages for block in message["content"] if isinstance(message["content"], list) and block["type"] == "tool_result"}
+    assert used == results
+
+
+def test_turns_start_at_user_messages_that_are_not_tool_results():
+    assert turn_start_indices(conversation(3)) == [0, 3, 6]
+
+
+def test_split_turns_keeps_tool_use_with_its_result():
+    turns = split_turns(conversation(3))
+    assert [len(turn) for turn in turns] == [3, 3, 3]
+    for turn in turns:
+        assert_no_split_tool_calls(turn)
+
+
+def test_split_for_compaction_cuts_at_turn_boundaries():
+    messages = conversation(4)
+    older, recent = split_for_compaction(messages, keep_last_turns=2)
+    assert older == messages[:6]
+    assert recent == messages[6:]
+    assert_no_split_tool_calls(older)
+    assert_no_split_tool_calls(recent)
+
+
+def test_split_for_compaction_with_fewer_turns_than_kept():
+    messages = conversation(2)
+    assert split_for_compaction(messages, keep_last_turns=5) == ([], messages)
+    assert split_for_compaction(messages, keep_last_turns=0) == (messages, [])
+
+
+def test_calibrate_scales_all_counts_the_first_time():
+    conversation_state = state([user("a" * 400), user("b" * 400)], overhead_tokens=100)
+    estimated = conversation_state.overhead_tokens + conversation_state.token_total
+    calibrate_token_counts(conversation_state, prompt_tokens=estimated * 2)
+    assert conversation_state.overhead_tokens == 200
+    assert conversation_state.confirmed_messages == 2
+    assert abs(conversation_state.overhead_tokens + conversation_state.token_total - estimated * 2) <= 2
+
+
+def test_calibrate_spreads_the_rest_over_new_messages_only():
+    conversation_state = state([user("a" * 400)], overhead_tokens=100)
+    calibrate_token_counts(conversation_state, prompt_tokens=300)
+    confirmed = list(conversation_state.message_tokens)
+    append_message(conversation_state, user("b" * 400))
+    calibrate_token_counts(conversation_state, prompt_tokens=600)
+    assert conversation_state.message_tokens[:1] == confirmed
+    assert conversation_state.message_tokens[1] == 600 - conversation_state.overhead_tokens - confirmed[0]
+    assert conversation_state.confirmed_messages == 2
+
+
+def test_message_page_counts_positions_across_compaction():
+    messages = [user(str(index)) for index in range(10)]
+    # 5 older messages were summarized away, so messages[0] is position 5.
+    page = message_page(messages, offset=5, cursor=7, limit=3)
+    assert [message["content"] for message in page["messages"]] == ["2", "3", "4"]
+    assert (page["cursor"], page["next_cursor"], page["has_more"], page["truncated"]) == (7, 10, True, False)
+    last = message_page(messages, offset=5, cursor=page["next_cursor"], limit=50)
+    assert (last["next_cursor"], last["has_more"]) == (15, False)
+
+
+def test_message_page_resumes_at_the_oldest_message_held():
+    page = message_page([user("a"), user("b")], offset=5, cursor=0, limit=1)
+    assert page["messages"] == [user("a")]
+    assert (page["cursor"], page["next_cursor"], page["truncated"]) == (5, 6, True)
+
+
+def test_message_page_never_moves_a_cursor_backwards():
+    messages = [user("a"), user("b")]
+    for cursor in (2, 7):
+        page = message_page(messages, offset=0, cursor=cursor, limit=10)
+        assert page["messages"] == []
+        assert page["next_cursor"] == cursor
+        assert not page["has_more"]
+    assert message_page(messages, offset=0, cursor=0, limit=0)["next_cursor"] == 0
+
+
+def test_carried_state_round_trips_through_continue_as_new():
+    state = LLMState(system_message="You are a bank.", tools=[{"name": "calculator"}], system_ref="sys", message_refs=["m"], blobs={"m": "{}"})
+    for message in conversation(4):
+        append_message(state, message, tokens=10)
+    older, recent = split_for_compaction(state.messages, keep_last_turns=1)
+    carried = CarriedState(
+        llm_state=carry_over_state(state, len(older), "summary of turns 0-2"),
+        input_message_queue=[{"from": "HDFC", "message": "quote", "sent_at": 1.5}],
+        pending_reminders=[{"due_at": 100.0, "time": 60, "message": "follow up"}],
+        message_offset=20 + len(older),
+        total_turns=7,
+    )
+    params = InvocationParams(user_id="Anil", run_id="run1", agent_type="consumer", carried_state=carried)
+
+    async def round_trip():
+        return (await DataConverter.default.decode(await DataConverter.default.encode([params]), [InvocationParams]))[0]
+    received = asyncio.run(round_trip()).carried_state
+
+    assert received == carried
+    assert received.llm_state.system_message == "" and received.llm_state.tools == []
+    assert received.llm_state.system_ref == "" and received.llm_state.message_refs == [] and received.llm_state.blobs == {}
+    restored = LLMState()
+    restore_carried_state(restored, received.llm_state)
+    assert restored.messages == recent
+    assert restored.message_tokens == [10] * len(recent)
+    assert restored.token_total == 10 * len(recent)
+    assert restored.summary == "summary of turns 0-2"
+    # Query cursors keep counting from the start of the whole conversation.
+    assert message_page(restored.messages, received.message_offset, 20 + len(older), 1)["messages"] == recent[:1]
+
+
+def test_take_input_batch_drains_in_arrival_order_up_to_max_batch():
+    queue = [{"from": f"merchant{index}", "message": "quote"} for index in range(5)]
+    arrived = list(queue)
+    policy = MessageBatchingPolicy(enabled=True, max_batch=3)
+    assert take_input_batch(queue, policy) == arrived[:3]
+    assert queue == arrived[3:]
+    assert take_input_batch(queue, policy) == arrived[3:]
+    assert queue == []
+
+
+def test_take_input_batch_without_batching_takes_one_message():
+    queue = ["a", "b"]
+    assert take_input_batch(queue, MessageBatchingPolicy(enabled=False, max_batch=10)) == ["a"]
+    assert queue == ["b"]
+    assert take_input_batch(queue, MessageBatchingPolicy(enabled=True, max_batch=0)) == ["b"]
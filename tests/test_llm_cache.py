@@ -0,0 +1,59 @@
+import llm_cache
+from llm_cache import LLMResponseCache, cache_hit_response, response_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **limits):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return LLMResponseCache(str(tmp_path / "responses.db"), **limits), clock
+
+
+def test_round_trip_and_key_stability():
+    key = response_cache_key("model", "system", [], [{"role": "user", "content": "hi"}], 100)
+    assert key == response_cache_key("model", "system", [], [{"content": "hi", "role": "user"}], 100)
+    assert key != response_cache_key("model", "system", [], [{"role": "user", "content": "hi"}], 200)
+
+
+def test_evicts_least_recently_used_over_max_entries(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch, max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats["evictions"] == 1
+
+
+def test_evicts_over_max_bytes(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch, max_bytes=100)
+    cache.put("a", {"text": "x" * 60})
+    cache.put("b", {"text": "y" * 60})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_expired_entries_miss(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_seconds=10)
+    cache.put("a", {"n": 1})
+    clock.now += 60
+    assert cache.get("a") is None
+    assert cache.stats["expired"] == 1
+
+
+def test_cache_hits_report_no_usage():
+    usage = {"input_tokens": 5120, "output_tokens": 310, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 4800}
+    response = cache_hit_response({"role": "assistant", "content": [], "usage": usage})
+    assert set(response["usage"].values()) == {0}
+    assert response["cached_usage"] == usage
+    assert response["timing"] == {"cached": True}
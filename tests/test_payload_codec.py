@@ -0,0 +1,60 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+from temporalio.converter import DataConverter
+
+from payload_codec import COMPRESSED_ENCODINGS, ZLIB, CompressionCodec, PayloadSettings
+
+
+@dataclass
+class Message:
+    to_id: str
+    body: str
+    tags: dict = field(default_factory=dict)
+
+
+VALUES = [
+    (Message("HDFC", "quote " * 2000, {"b": 1, "a": 2}), Message),
+    ({"usage": {"input_tokens": 10, "ratio": 1e16}, "content": [{"type": "text", "text": "hi"}]}, dict),
+    ("short", str),
+    (None, type(None)),
+]
+
+
+def round_trip(converter, value, hint):
+    async def run():
+        payloads = await converter.encode([value])
+        return payloads, (await converter.decode(payloads, [hint]))[0]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("settings", [
+    PayloadSettings(fast_json=True),
+    PayloadSettings(compression=ZLIB, compress_min_bytes=100),
+    PayloadSettings(fast_json=True, compression=ZLIB, compress_min_bytes=100),
+])
+@pytest.mark.parametrize("value, hint", VALUES)
+def test_round_trip(settings, value, hint):
+    _, decoded = round_trip(settings.data_converter(), value, hint)
+    assert decoded == value
+
+
+@pytest.mark.parametrize("value, hint", VALUES)
+def test_fast_json_is_readable_by_the_default_converter(value, hint):
+    payloads, _ = round_trip(PayloadSettings(fast_json=True).data_converter(), value, hint)
+    decoded = asyncio.run(DataConverter.default.decode(payloads, [hint]))[0]
+    assert decoded == value
+
+
+def test_only_large_payloads_are_compressed():
+    converter = PayloadSettings(compression=ZLIB, compress_min_bytes=1000).data_converter()
+    large, _ = round_trip(converter, "x" * 5000, str)
+    small, _ = round_trip(converter, "x" * 10, str)
+    assert large[0].metadata["encoding"] == COMPRESSED_ENCODINGS[ZLIB]
+    assert small[0].metadata["encoding"] == b"json/plain"
+
+
+def test_codec_decodes_uncompressed_history():
+    payloads = asyncio.run(DataConverter.default.encode(["x" * 5000]))
+    assert asyncio.run(CompressionCodec(ZLIB, min_bytes=100).decode(payloads)) == list(payloads)
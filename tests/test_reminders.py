@@ -0,0 +1,37 @@
+from reminders import ReminderQueue
+
+
+def test_reminders_come_out_by_due_time():
+    reminders = ReminderQueue()
+    reminders.add(300.0, 300, "check the quotes")
+    reminders.add(60.0, 60, "nudge the banks")
+    reminders.add(120.0, 120, "ask the merchants")
+    assert reminders.next_due_at() == 60.0
+    assert [reminders.pop()["message"] for _ in range(3)] == ["nudge the banks", "ask the merchants", "check the quotes"]
+    assert not reminders
+    assert reminders.next_due_at() is None
+
+
+def test_reminders_due_together_keep_the_order_they_were_set_in():
+    reminders = ReminderQueue()
+    for message in ("first", "second", "third"):
+        reminders.add(60.0, 60, message)
+    assert [reminders.pop()["message"] for _ in range(3)] == ["first", "second", "third"]
+
+
+def test_pending_reminders_carry_over_to_the_next_run():
+    reminders = ReminderQueue()
+    reminders.add(300.0, 300, "later")
+    reminders.add(60.0, 60, "sooner")
+    reminders.add(60.0, 60, "also sooner")
+    reminders.pop()
+    pending = reminders.pending()
+    assert pending == [
+        {"due_at": 60.0, "time": 60, "message": "also sooner"},
+        {"due_at": 300.0, "time": 300, "message": "later"},
+    ]
+    carried = ReminderQueue(pending)
+    assert len(carried) == 2
+    assert carried.pending() == pending
+    carried.add(60.0, 60, "set in the new run")
+    assert [carried.pop()["message"] for _ in range(3)] == ["also sooner", "set in the new run", "later"]
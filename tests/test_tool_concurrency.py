@@ -0,0 +1,58 @@
+import asyncio
+from collections import Counter
+
+from tool_concurrency import ToolConcurrencyLimiter
+from workflow_types import ToolConcurrencyPolicy
+
+
+async def run_calls(limiter, calls):
+    """Run (activity_name, seconds) calls like _invoke_tools_ does; return results and peak concurrency."""
+    running = Counter()
+    peaks = Counter()
+
+    async def call(index, activity_name, seconds):
+        async with limiter.slot(activity_name):
+            running[activity_name] += 1
+            running["*"] += 1
+            peaks[activity_name] = max(peaks[activity_name], running[activity_name])
+            peaks["*"] = max(peaks["*"], running["*"])
+            await asyncio.sleep(seconds)
+            running[activity_name] -= 1
+            running["*"] -= 1
+        return f"{activity_name}-{index}"
+
+    results = await asyncio.gather(*(call(index, name, seconds) for index, (name, seconds) in enumerate(calls)))
+    return results, peaks
+
+
+def test_global_and_per_tool_caps():
+    limiter = ToolConcurrencyLimiter(ToolConcurrencyPolicy(max_concurrent=3, per_tool={"send_message_to_agent_tool": 1}))
+    calls = [("send_message_to_agent_tool", 0.01)] * 4 + [("calculator", 0.01)] * 6
+    _, peaks = asyncio.run(run_calls(limiter, calls))
+    assert peaks["send_message_to_agent_tool"] == 1
+    assert peaks["*"] == 3
+
+
+def test_results_keep_call_order_when_calls_finish_out_of_order():
+    limiter = ToolConcurrencyLimiter(ToolConcurrencyPolicy(max_concurrent=2))
+    calls = [("lookup", 0.03), ("lookup", 0.0), ("rank", 0.02), ("rank", 0.0)]
+    results, _ = asyncio.run(run_calls(limiter, calls))
+    assert results == ["lookup-0", "lookup-1", "rank-2", "rank-3"]
+
+
+def test_a_waiting_call_does_not_hold_a_global_slot():
+    limiter = ToolConcurrencyLimiter(ToolConcurrencyPolicy(max_concurrent=2, per_tool={"send": 1}))
+    finished = []
+
+    async def call(activity_name, seconds):
+        async with limiter.slot(activity_name):
+            await asyncio.sleep(seconds)
+        finished.append(activity_name)
+
+    async def run():
+        await asyncio.gather(call("send", 0.05), call("send", 0.05), call("calculator", 0.01))
+
+    asyncio.run(run())
+    # The second send waits for the first one's per-tool slot, not in a global one, so the
+    # calculator call is not stuck behind it.
+    assert finished == ["calculator", "send", "send"]
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from tool_registry import (
+    ACTIVITY,
+    DEFAULT_TOOL_NAMES,
+    WORKFLOW,
+    ToolSchemaError,
+    builtin_tool_registry,
+    describe_tool_input_error,
+    input_list,
+    input_str,
+)
+
+
+def custom_tool(name):
+    return {"name": name, "description": "", "input_schema": {"type": "object", "properties": {}}}
+
+
+def test_for_agent_keeps_config_order_and_routes_unknown_tools_to_activities():
+    registry = builtin_tool_registry.for_agent(
+        [builtin_tool_registry.get("schedule_reminder").as_dict(), custom_tool("lookup_offer")],
+        [json.dumps(custom_tool("rank_offers"))],
+    )
+    assert registry.names() == ["schedule_reminder", "lookup_offer", "rank_offers"]
+    assert registry.get("schedule_reminder").handler.kind == WORKFLOW
+    assert registry.get("lookup_offer").handler.kind == ACTIVITY
+    assert registry.get("lookup_offer").handler.target == "lookup_offer"
+
+
+def test_default_tools_are_messaging_only():
+    assert [schema["name"] for schema in builtin_tool_registry.schemas_for(DEFAULT_TOOL_NAMES)] == list(DEFAULT_TOOL_NAMES)
+    with pytest.raises(ToolSchemaError):
+        builtin_tool_registry.schemas_for(["no_such_tool"])
+
+
+def test_input_list_accepts_json_encoded_lists():
+    assert input_list({"to_ids": '["HDFC", "ICICI"]'}, "to_ids", str) == ["HDFC", "ICICI"]
+    assert input_list({}, "to_ids", str) == []
+
+
+@pytest.mark.parametrize("tool_input, key, item_type", [
+    ({"to_ids": "[HDFC"}, "to_ids", str),
+    ({"to_ids": "HDFC"}, "to_ids", str),
+    ({"to_ids": [1, 2]}, "to_ids", str),
+    ({"agent_messages": ["hi"]}, "agent_messages", dict),
+])
+def test_input_list_rejects_malformed_input(tool_input, key, item_type):
+    with pytest.raises((TypeError, ValueError)) as error:
+        input_list(tool_input, key, item_type)
+    assert key in describe_tool_input_error(error.value) or "JSON" in describe_tool_input_error(error.value)
+
+
+def test_input_str_reports_missing_and_mistyped_fields():
+    with pytest.raises(KeyError) as missing:
+        input_str({}, "message")
+    assert describe_tool_input_error(missing.value) == "missing required field 'message'"
+    with pytest.raises(TypeError, match="message must be a string"):
+        input_str({"message": 60}, "message")
@@ -0,0 +1,24 @@
+from task_routing import HASHED, PER_AGENT, SHARED, TaskQueueRouting
+from worker_tuning import LLM_HEAVY, WorkerTuning, polls_llm_task_queue
+from workflow_types import AgentConfigSnapshot
+
+
+def snapshot(user_id, **settings):
+    return AgentConfigSnapshot(agent_type="issuer", user_id=user_id, version="v1", system_msg="", settings=settings)
+
+
+def test_pools_always_poll_the_llm_queue():
+    # Agents whose configs are written after the pool started may route llm_call to "-llm".
+    for mode in (SHARED, HASHED):
+        routing = TaskQueueRouting(mode=mode)
+        for task_queue in routing.pool_task_queues():
+            assert polls_llm_task_queue(WorkerTuning(), routing, task_queue, [])
+
+
+def test_per_agent_workers_poll_the_llm_queue_when_tuned_or_asked():
+    routing = TaskQueueRouting(mode=PER_AGENT)
+    assert polls_llm_task_queue(LLM_HEAVY, routing, "HDFC-queue", [])
+    assert not polls_llm_task_queue(WorkerTuning(), routing, "HDFC-queue", [snapshot("HDFC")])
+    assert not polls_llm_task_queue(WorkerTuning(), routing, "HDFC-queue", [snapshot("ICICI", llm_task_queue=True)])
+    assert polls_llm_task_queue(WorkerTuning(), routing, "HDFC-queue", [snapshot("HDFC", llm_task_queue=True)])
+